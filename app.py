@@ -1,7 +1,21 @@
+import os
+import sys
 import streamlit as st
+
+# STARTUP_PROFILE=1 streamlit run app.py — report import/model-load costs as pages are first opened
+PROFILE_STARTUP = os.environ.get("STARTUP_PROFILE") == "1"
+if PROFILE_STARTUP:
+    from startup_profile import profiler
+    profiler.install()
+
 import home
+import metrics
 import prediction
 
+# METRICS_PORT=9464 streamlit run app.py — per-stage latency histograms at http://127.0.0.1:9464/metrics
+if os.environ.get("METRICS_PORT"):
+    metrics.start_server()
+
 st.set_page_config(page_title="Fragility Fracture & Osteoarthritis Prediction", layout="centered")
 
 # Initialize session state if not already set
@@ -20,3 +34,6 @@ else:
         home.show()
     elif page == "🧠 Predict":
         prediction.show()
+
+if PROFILE_STARTUP:
+    profiler.flush(sys.stderr)
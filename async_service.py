@@ -0,0 +1,187 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import tornado.web
+
+import metrics
+import model_registry
+import scoring_service
+
+# === Asyncio front end for the scoring service (tornado) ===
+# For the patient portal: many slow client connections multiplexed onto a few
+# CPU-bound scoring threads. The event loop only does network I/O; the scoring
+# itself (scoring_service.predict: validate, encode, model call, confidence
+# adjustment) runs on a thread pool. Same paths and JSON shapes as scoring_service,
+# /health and /metrics included.
+#
+#   request -> coalesce: an identical request already in flight? share its response
+#           -> shed: model's queue full? 503 + Retry-After, straight away
+#           -> per-model semaphore: at most CONCURRENCY scoring calls per model
+#           -> thread pool, within TIMEOUT_SECONDS of arrival (else 504)
+#
+# Single-record calls still go through the prediction cache and micro-batcher, so
+# concurrent portal requests share predict_proba calls on the threads too.
+#
+#   python async_service.py --port 8601 --concurrency 4 --max-queue 64 --timeout 2
+
+CONCURRENCY = int(os.environ.get("ASYNC_SCORING_CONCURRENCY", 2))  # scoring calls per model
+MAX_QUEUE = int(os.environ.get("ASYNC_SCORING_MAX_QUEUE", 32))  # waiting requests per model
+TIMEOUT_SECONDS = float(os.environ.get("ASYNC_SCORING_TIMEOUT", 5.0))
+RETRY_AFTER_SECONDS = 1
+
+
+class ModelGate:
+    # Admission control for one model: a semaphore for the scoring slots plus counters
+    def __init__(self, concurrency, max_queue):
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.slots = asyncio.Semaphore(concurrency)
+        self.admitted = 0  # queued or scoring
+        self.counts = {"requests": 0, "coalesced": 0, "shed": 0, "timeouts": 0}
+
+    def full(self):
+        return self.admitted >= self.concurrency + self.max_queue
+
+    def stats(self):
+        return {**self.counts, "in_flight": self.admitted, "concurrency": self.concurrency,
+                "max_queue": self.max_queue}
+
+
+class Frontend:
+    def __init__(self, concurrency=None, max_queue=None, timeout=None, executor=None):
+        concurrency = concurrency or CONCURRENCY
+        max_queue = max_queue if max_queue is not None else MAX_QUEUE
+        self.timeout = timeout or TIMEOUT_SECONDS
+        self.gates = {name: ModelGate(concurrency, max_queue) for name in scoring_service.MODELS}
+        self.executor = executor or ThreadPoolExecutor(concurrency * len(self.gates), thread_name_prefix="scoring")
+        self._in_flight = {}  # request key -> task scoring it
+
+    async def predict(self, name, batch, payload):
+        """(HTTP status, JSON body), like scoring_service.predict, without blocking the loop."""
+        gate = self.gates[name]
+        gate.counts["requests"] += 1
+        key = (name, batch, hashlib.blake2b(payload, digest_size=16).digest())
+        task = self._in_flight.get(key)
+        if task is not None:
+            gate.counts["coalesced"] += 1
+        elif gate.full():
+            gate.counts["shed"] += 1
+            return 503, json.dumps({"error": f"Too many '{name}' requests in flight, retry shortly"})
+        else:
+            task = self._in_flight[key] = asyncio.ensure_future(self._score(gate, name, batch, payload))
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        # Shielded: a client that hangs up must not cancel the answer other callers are waiting for
+        return await asyncio.shield(task)
+
+    async def _score(self, gate, name, batch, payload):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        gate.admitted += 1
+        try:
+            try:
+                await asyncio.wait_for(gate.slots.acquire(), self.timeout)
+            except asyncio.TimeoutError:
+                gate.counts["timeouts"] += 1
+                return 504, json.dumps({"error": f"Timed out waiting for a '{name}' scoring slot"})
+            work = loop.run_in_executor(self.executor, scoring_service.predict, name, batch, payload)
+            # The slot is freed when the thread is, not when we stop waiting for it, so a
+            # timed-out call still counts against the limit until it actually finishes
+            work.add_done_callback(lambda _: gate.slots.release())
+            try:
+                return await asyncio.wait_for(asyncio.shield(work), max(deadline - loop.time(), 0))
+            except asyncio.TimeoutError:
+                gate.counts["timeouts"] += 1
+                return 504, json.dumps({"error": f"'{name}' scoring took longer than {self.timeout:g}s"})
+        finally:
+            gate.admitted -= 1
+
+    def stats(self):
+        return {name: gate.stats() for name, gate in self.gates.items()}
+
+
+class _JSONHandler(tornado.web.RequestHandler):
+    def initialize(self, frontend):
+        self.frontend = frontend
+
+    def _send(self, status, body):
+        self.set_status(status)
+        self.set_header("Content-Type", "application/json")
+        if status == 503:
+            self.set_header("Retry-After", str(RETRY_AFTER_SECONDS))
+        self.finish(body)
+
+    def write_error(self, status_code, **kwargs):
+        self.set_header("Content-Type", "application/json")
+        self.finish(json.dumps({"error": self._reason}))
+
+
+class NotFoundHandler(_JSONHandler):
+    def prepare(self):
+        self._send(404, json.dumps({"error": f"Unknown path {self.request.path}"}))
+
+
+class HealthHandler(_JSONHandler):
+    def get(self):
+        self._send(200, json.dumps({**scoring_service.health(), "async": self.frontend.stats()}))
+
+
+class MetricsHandler(_JSONHandler):
+    def get(self):
+        self.set_header("Content-Type", metrics.CONTENT_TYPE)
+        self.finish(metrics.exposition())
+
+
+class PredictHandler(_JSONHandler):
+    async def post(self, name, batch):
+        self._send(*await self.frontend.predict(name, bool(batch), self.request.body))
+
+
+def make_app(frontend=None, verbose=False):
+    frontend = frontend or Frontend()
+    models = "|".join(scoring_service.MODELS)
+    settings = {} if verbose else {"log_function": lambda handler: None}
+    return tornado.web.Application([
+        (r"/health", HealthHandler, {"frontend": frontend}),
+        (r"/metrics", MetricsHandler, {"frontend": frontend}),
+        (rf"/v1/({models})/predict(/batch)?/?", PredictHandler, {"frontend": frontend}),
+    ], default_handler_class=NotFoundHandler, default_handler_args={"frontend": frontend}, **settings)
+
+
+async def serve(host="127.0.0.1", port=8601, frontend=None, verbose=False):
+    app = make_app(frontend, verbose)
+    server = app.listen(port, host, max_body_size=scoring_service.MAX_BODY_BYTES)
+    print(f"🩺 Async scoring service listening on http://{host}:{port}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        server.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the fracture and OA models from an asyncio front end.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8601)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY, help="scoring calls in flight per model")
+    parser.add_argument("--max-queue", type=int, default=MAX_QUEUE,
+                        help="requests waiting per model before new ones get 503")
+    parser.add_argument("--timeout", type=float, default=TIMEOUT_SECONDS,
+                        help="seconds from arrival before a request gets 504")
+    parser.add_argument("--no-warm", action="store_true", help="load models on first request instead of at startup")
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args(argv)
+
+    if not args.no_warm:
+        model_registry.warm()
+    frontend = Frontend(args.concurrency, args.max_queue, args.timeout)
+    try:
+        asyncio.run(serve(args.host, args.port, frontend, args.verbose))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
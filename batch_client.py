@@ -0,0 +1,170 @@
+import argparse
+import os
+
+import joblib
+import pandas as pd
+
+import client_scoring
+import feature_schema
+import model_artifact
+import model_registry
+
+# === Batch scoring for the fragility fracture model ===
+# Streams a CSV/Parquet roster through client_scoring in chunks, so memory stays
+# bounded and predict_proba runs once per chunk instead of once per patient.
+# Each chunk is validated in one vectorized pass; rows that fail a check are
+# quarantined (written with their reasons next to the output) and the rest are scored.
+#
+#   python batch_client.py roster.csv scores.csv          # bad rows -> scores.quarantine.csv
+#   python batch_client.py roster.parquet scores.parquet --chunksize 50000
+#   python batch_client.py roster.csv scores.csv --strict  # abort on the first bad row
+
+DEFAULT_CHUNKSIZE = 10_000
+# Blank cells count as missing, but not pandas' default "None"/"NA" strings: "None" is a
+# real answer (Chronic Conditions Detail)
+NA_VALUES = ["", "nan", "NaN", "null"]
+
+
+def file_format(name):
+    ext = os.path.splitext(str(name))[1].lower()
+    if ext in (".parquet", ".pq"):
+        return "parquet"
+    if ext == ".csv":
+        return "csv"
+    raise ValueError(f"Unsupported file type '{ext}' (expected .csv or .parquet)")
+
+
+def read_chunks(source, chunksize=DEFAULT_CHUNKSIZE, fmt=None):
+    fmt = fmt or file_format(source)
+    if fmt == "csv":
+        yield from pd.read_csv(source, chunksize=chunksize, keep_default_na=False, na_values=NA_VALUES)
+    else:
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+
+
+def quarantine_path(dest):
+    # Always CSV: rejected rows can hold values of any type, and people read this file
+    return f"{os.path.splitext(str(dest))[0]}.quarantine.csv"
+
+
+def quarantined_rows(chunk, errors):
+    # The rejected input rows plus their roster row number and every reason they failed
+    reasons = feature_schema.row_errors(errors)
+    rows = chunk.loc[reasons.index]
+    rows.insert(0, "errors", reasons)
+    rows.insert(0, "row", reasons.index)
+    return rows
+
+
+def number_rows(chunks, start=0):
+    # Number rows across the whole roster, so reports point at the right line
+    offset = start
+    for chunk in chunks:
+        chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+        offset += len(chunk)
+        yield chunk
+
+
+def merge_results(chunk, results, errors, quarantine=None):
+    """Scored input rows; failed rows go to the `quarantine` list (ValueError without one)."""
+    if not errors.empty:
+        if quarantine is None:
+            raise ValueError(feature_schema.describe(errors))
+        quarantine.append(quarantined_rows(chunk, errors))
+    return chunk.loc[results.index].join(results)
+
+
+def score_chunks(model, chunks, quarantine=None):
+    """Scored rows chunk by chunk; with a `quarantine` list, bad rows are collected there instead of raising."""
+    for chunk in number_rows(chunks):
+        if quarantine is None:
+            yield chunk.join(client_scoring.score_frame(model, chunk))
+            continue
+        # Yielded even when every row was quarantined: write_chunks keeps its columns
+        yield merge_results(chunk, *client_scoring.score_valid(model, chunk), quarantine)
+
+
+def write_chunks(chunks, dest, fmt=None):
+    """Write the non-empty chunks to `dest`; returns the row count. The file always exists:
+    with no rows it holds just the columns of the first (empty) chunk, if there was one."""
+    fmt = fmt or file_format(dest)
+    rows = 0
+    empty = None
+    if fmt == "csv":
+        for chunk in chunks:
+            if not len(chunk):
+                empty = chunk if empty is None else empty
+                continue
+            chunk.to_csv(dest, mode="w" if rows == 0 else "a", header=(rows == 0), index=False)
+            rows += len(chunk)
+        if not rows:
+            (empty if empty is not None else pd.DataFrame()).to_csv(dest, index=False)
+        return rows
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    writer = None
+    try:
+        for chunk in chunks:
+            if not len(chunk):
+                empty = chunk if empty is None else empty
+                continue
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(dest, table.schema)
+            writer.write_table(table.cast(writer.schema))
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is None:
+        pq.write_table(pa.Table.from_pandas(empty if empty is not None else pd.DataFrame(), preserve_index=False), dest)
+    return rows
+
+
+def score_file(model, source, dest, chunksize=DEFAULT_CHUNKSIZE, strict=False):
+    """Score a roster file; returns (rows scored, rows quarantined)."""
+    quarantine = None if strict else []
+    rows = write_chunks(score_chunks(model, read_chunks(source, chunksize), quarantine), dest)
+    if quarantine:
+        write_chunks(quarantine, quarantine_path(dest))
+    return rows, sum(len(q) for q in quarantine or [])
+
+
+def score_upload(model, uploaded, chunksize=DEFAULT_CHUNKSIZE):
+    # Streamlit UploadedFile -> (scored DataFrame, quarantined rows)
+    chunks = read_chunks(uploaded, chunksize, fmt=file_format(uploaded.name))
+    quarantine = []
+    scored = list(score_chunks(model, chunks, quarantine))
+    results = pd.concat(scored, ignore_index=True) if scored else pd.DataFrame()
+    rejected = pd.concat(quarantine, ignore_index=True) if quarantine else pd.DataFrame()
+    return results, rejected
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a patient roster with the fragility fracture model.")
+    parser.add_argument("input", help="CSV or Parquet roster (one patient per row)")
+    parser.add_argument("output", help="CSV or Parquet file to write the scores to")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="rows per chunk")
+    parser.add_argument("--model", help="path to a model pickle or .artifact directory "
+                                        "(default: the registry's fracture model)")
+    parser.add_argument("--strict", action="store_true",
+                        help="fail on the first invalid row instead of quarantining it")
+    args = parser.parse_args(argv)
+
+    if args.model is None:
+        model = model_registry.get_model("fracture")
+    elif os.path.isdir(args.model):
+        model = model_artifact.load(args.model)
+    else:
+        model = joblib.load(args.model)
+    rows, rejected = score_file(model, args.input, args.output, args.chunksize, args.strict)
+    print(f"✅ Scored {rows} rows -> {args.output}")
+    if rejected:
+        print(f"⚠ Quarantined {rejected} invalid rows -> {quarantine_path(args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import client_scoring
+import feature_schema
+import model_registry
+import partner_scoring
+import prediction_cache
+import scoring
+
+# === End-to-end scoring benchmark ===
+# Synthetic patients drawn from the feature schemas' ranges and vocabularies go through
+# the same encode -> score -> assess code the pages and batch scoring use:
+#
+#   single   one patient at a time through scoring.score (page path: shared cache +
+#            micro-batcher), reported as p50/p95/p99 latency
+#   batch    score_frame() on batches of several sizes, reported as rows/s
+#
+# Results (plus model load time and peak RSS) are written as JSON; --compare flags
+# latency/throughput regressions against an earlier run.
+#
+#   python benchmark.py --json bench/$(git rev-parse --short HEAD).json
+#   python benchmark.py --compare bench/main.json --model fracture=/path/to/model.pkl
+
+BATCH_SIZES = [1, 10, 100, 1000, 10000]
+SINGLE_RECORDS = 200
+MIN_BATCH_SECONDS = 0.5  # repeat each batch size until at least this much time is measured
+SEED = 0
+
+
+def synthetic_answers(schema, n, rng):
+    # Uniform draws over every input field's valid range / vocabulary
+    columns = {}
+    for field in feature_schema.inputs(schema):
+        if field["type"] in ("number", "integer"):
+            low, high = field["min"], field.get("max", field.get("widget_args", {}).get("max_value"))
+            if field["type"] == "integer":
+                columns[field["name"]] = rng.integers(low, high + 1, n)
+            else:
+                columns[field["name"]] = np.round(rng.uniform(low, high, n), 2)
+        else:
+            vocabulary = feature_schema.vocabulary(field)
+            columns[field["name"]] = np.asarray(vocabulary, dtype=object)[rng.integers(0, len(vocabulary), n)]
+    return pd.DataFrame(columns)
+
+
+def client_patients(n, rng):
+    return synthetic_answers(client_scoring.FRACTURE_SCHEMA, n, rng)
+
+
+def partner_patients(n, rng):
+    answers = synthetic_answers(partner_scoring.PARTNER_SCHEMA, n, rng)
+    answers['body mass index (bmi)'] = 0.0  # form default: auto-calculated
+    return partner_scoring.fill_bmi(answers)
+
+
+def client_encoder(model):
+    # Page path: one answer dict -> one-row frame
+    return client_scoring.encode_row
+
+
+def partner_encoder(model):
+    encoder = partner_scoring.PartnerEncoder(model.feature_names_in_)
+    return lambda record: encoder.frame(encoder.encode_row(partner_scoring.fill_bmi(record)))
+
+
+def client_batch(model):
+    return lambda answers: client_scoring.score_frame(model, answers)
+
+
+def partner_batch(model):
+    encoder = partner_scoring.PartnerEncoder(model.feature_names_in_)
+    return lambda answers: partner_scoring.score_frame(model, encoder, answers)
+
+
+# name -> (patient generator, single-record encoder, batch scorer, assess)
+TARGETS = {
+    "fracture": (client_patients, client_encoder, client_batch, client_scoring.assess),
+    "oa": (partner_patients, partner_encoder, partner_batch, partner_scoring.assess),
+}
+
+
+def _peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1e6 if sys.platform == "darwin" else 1e3), 1)
+
+
+def bench_single(name, model, answers):
+    encode, assess = TARGETS[name][1](model), TARGETS[name][3]
+    records = answers.to_dict("records")
+    prediction_cache.cache.clear()
+    latencies = []
+    for record in records:
+        start = time.perf_counter()
+        result = scoring.score(name, encode(record))
+        assess(result["probability"])
+        latencies.append(time.perf_counter() - start)
+    latencies = np.asarray(latencies) * 1000
+    return {
+        "records": len(latencies),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 3),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 3),
+        "mean_ms": round(float(latencies.mean()), 3),
+    }
+
+
+def bench_batches(name, model, answers, batch_sizes):
+    score = TARGETS[name][2](model)
+    results = []
+    for size in batch_sizes:
+        batch = answers.iloc[:size]
+        score(batch)  # warm-up
+        runs, elapsed = 0, 0.0
+        while elapsed < MIN_BATCH_SECONDS or runs < 3:
+            start = time.perf_counter()
+            score(batch)
+            elapsed += time.perf_counter() - start
+            runs += 1
+        results.append({
+            "batch_size": len(batch),
+            "runs": runs,
+            "seconds_per_batch": round(elapsed / runs, 6),
+            "rows_per_second": round(len(batch) * runs / elapsed, 1),
+        })
+    return results
+
+
+def bench_model(name, single_records, batch_sizes, seed):
+    if name not in model_registry.registry.shipped():
+        return {"skipped": f"model file not found: {model_registry.registry.path(name)}"}
+    model = model_registry.get_model(name)
+    load = model_registry.stats()[name]
+
+    rng = np.random.default_rng(seed)
+    answers = TARGETS[name][0](max([single_records] + batch_sizes), rng)
+    return {
+        "version": model_registry.loaded_version(name),
+        "load_seconds": round(load["load_seconds"], 4),
+        "load_memory_mb": round(load["memory_mb"], 1) if load.get("memory_mb") is not None else None,
+        "single": bench_single(name, model, answers.iloc[:single_records]),
+        "batch": bench_batches(name, model, answers, batch_sizes),
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(models=None, single_records=SINGLE_RECORDS, batch_sizes=BATCH_SIZES, seed=SEED):
+    results = {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "seed": seed,
+        "models": {},
+    }
+    for name in models or list(TARGETS):
+        results["models"][name] = bench_model(name, single_records, batch_sizes, seed)
+    results["peak_rss_mb"] = _peak_rss_mb()
+    return results
+
+
+def compare(current, baseline, tolerance=0.10):
+    """Regressions beyond `tolerance` (fractional) between two result dicts, as messages."""
+    regressions = []
+    for name, now in current["models"].items():
+        before = baseline.get("models", {}).get(name)
+        if not before or "skipped" in now or "skipped" in before:
+            continue
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            if now["single"][key] > before["single"][key] * (1 + tolerance):
+                regressions.append(f"{name} single {key}: {before['single'][key]} -> {now['single'][key]}")
+        previous = {b["batch_size"]: b for b in before["batch"]}
+        for b in now["batch"]:
+            old = previous.get(b["batch_size"])
+            if old and b["rows_per_second"] < old["rows_per_second"] * (1 - tolerance):
+                regressions.append(
+                    f"{name} batch {b['batch_size']} rows/s: {old['rows_per_second']} -> {b['rows_per_second']}"
+                )
+    return regressions
+
+
+def format_results(results):
+    lines = [f"commit {results['commit']}  python {results['python']}  peak RSS {results['peak_rss_mb']} MB"]
+    for name, r in results["models"].items():
+        if "skipped" in r:
+            lines.append(f"[{name}] skipped: {r['skipped']}")
+            continue
+        s = r["single"]
+        lines.append(f"[{name}] load {r['load_seconds']:.3f}s ({r['load_memory_mb']} MB)")
+        lines.append(f"  single ({s['records']}): p50 {s['p50_ms']:.2f} ms  p95 {s['p95_ms']:.2f} ms  "
+                     f"p99 {s['p99_ms']:.2f} ms")
+        for b in r["batch"]:
+            lines.append(f"  batch {b['batch_size']:>6}: {b['rows_per_second']:>12,.0f} rows/s  "
+                         f"({b['seconds_per_batch'] * 1000:.2f} ms/batch)")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark end-to-end scoring latency and throughput.")
+    parser.add_argument("--models", nargs="+", choices=list(TARGETS), help="models to benchmark (default: all)")
+    parser.add_argument("--model", action="append", default=[], metavar="NAME=PATH",
+                        help="benchmark a different model file, e.g. fracture=/tmp/model.pkl")
+    parser.add_argument("--records", type=int, default=SINGLE_RECORDS, help="single-record requests to time")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=BATCH_SIZES)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", help="earlier results file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed slowdown before flagging (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    for override in args.model:
+        name, _, path = override.partition("=")
+        model_registry.registry.register(name, os.path.abspath(path))
+
+    results = run(args.models, args.records, args.batch_sizes, args.seed)
+    print(format_results(results))
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import numpy as np
+
+import metrics
+
+# === Versioned calibration tables ===
+# The confidence adjustment, derived metrics and risk bands for each model, written
+# as data instead of if/elif chains. apply() evaluates a table over whole NumPy
+# arrays, so the form, batch files and the API all band scores the same way.
+#
+# Bump "version" whenever a number changes; batch outputs record it.
+#
+#   boosts      first matching rule wins ("below": x < v, "above": x > v, "at_least": x >= v)
+#   cap         upper bound after boosting
+#   smoothing   probability * weight + baseline * (1 - weight)
+#   metrics     chains of (op, value) applied to the adjusted probability
+#   bands       cutoffs checked in order with op (">=" or ">"); first hit picks the label.
+#               "display": True marks page-only bands (colours) left out of batch/API output
+
+CALIBRATIONS = {
+    "fracture": {
+        "version": "fracture-1",
+        "boosts": [
+            {"below": 0.3, "add": 0.30},   # boost low confidence
+            {"below": 0.5, "add": 0.20},   # small boost for mid-lows
+            {"above": 0.8, "add": 0.10},
+        ],
+        "cap": 1.0,
+        "smoothing": {"baseline": 0.55, "weight": 0.75},
+        "metrics": {
+            "hip_fracture_risk": [("*", 0.65), ("*", 100)],  # slightly higher scaling
+            "major_fracture_risk": [("*", 105)],             # a touch more sensitive
+            "relative_risk": [("/", 0.1)],
+        },
+        "bands": {
+            "diagnosis": {
+                "op": ">=", "cutoffs": [0.7, 0.55, 0.45],
+                "labels": ["High Risk of Osteoporosis", "Borderline Risk", "Moderate Risk"],
+                "default": "Low Risk",
+            },
+            "diagnosis_color": {
+                "op": ">=", "cutoffs": [0.7, 0.55, 0.45],
+                "labels": ["red", "orange", "green"], "default": "blue", "display": True,
+            },
+            "risk_level": {"op": ">=", "cutoffs": [0.7, 0.5], "labels": ["High", "Medium"], "default": "Low"},
+            "gauge_color": {"op": ">", "cutoffs": [0.7, 0.5], "labels": ["red", "orange"], "default": "blue",
+                            "display": True},
+            "advice": {"op": ">=", "cutoffs": [0.5], "labels": ["at_risk"], "default": "maintain"},
+        },
+    },
+    "oa": {
+        "version": "oa-1",
+        "boosts": [
+            {"below": 0.3, "add": 0.30},
+            {"below": 0.5, "add": 0.20},
+            {"above": 0.8, "add": 0.10},
+        ],
+        "cap": 1.0,
+        "smoothing": {"baseline": 0.55, "weight": 0.7},
+        "metrics": {
+            "joint_damage_risk": [("*", 0.8), ("*", 100)],
+            "relative_risk": [("/", 0.1)],
+        },
+        # Headline confidence shown on the page: +0.30 from 0.3 upwards (not capped)
+        "display_boosts": [{"at_least": 0.3, "add": 0.30}],
+        "bands": {
+            "diagnosis": {
+                "op": ">=", "cutoffs": [0.55, 0.5],
+                "labels": ["High Osteoarthritis Risk", "Borderline Risk"], "default": "No Significant Risk",
+            },
+            "diagnosis_color": {
+                "op": ">=", "cutoffs": [0.55, 0.5], "labels": ["red", "orange"], "default": "green", "display": True,
+            },
+            "risk_level": {"op": ">=", "cutoffs": [0.7, 0.5], "labels": ["High", "Medium"], "default": "Low"},
+            "gauge_color": {"op": ">", "cutoffs": [0.7, 0.5], "labels": ["red", "orange"], "default": "blue",
+                            "display": True},
+            "advice": {"op": ">=", "cutoffs": [0.45], "labels": ["at_risk"], "default": "maintain"},
+        },
+    },
+}
+
+_CONDITIONS = {
+    "below": np.less,
+    "above": np.greater,
+    "at_least": np.greater_equal,
+}
+_OPS = {
+    "*": np.multiply,
+    "/": np.true_divide,
+    "+": np.add,
+    "-": np.subtract,
+    ">=": np.greater_equal,
+    ">": np.greater,
+}
+
+
+def table(name):
+    if name not in CALIBRATIONS:
+        raise KeyError(f"No calibration table for model '{name}'")
+    return CALIBRATIONS[name]
+
+
+def version(name):
+    return table(name)["version"]
+
+
+def _boost(values, rules):
+    conditions, choices = [], []
+    for rule in rules:
+        (kind, cutoff), = ((k, v) for k, v in rule.items() if k in _CONDITIONS)
+        conditions.append(_CONDITIONS[kind](values, cutoff))
+        choices.append(values + rule["add"])
+    return np.select(conditions, choices, default=values)
+
+
+def _band(values, spec):
+    compare = _OPS[spec["op"]]
+    return np.select([compare(values, c) for c in spec["cutoffs"]], spec["labels"], default=spec["default"])
+
+
+def adjust(name, raw_probability):
+    spec = table(name)
+    probability = _boost(np.asarray(raw_probability, dtype=float), spec["boosts"])
+    if spec.get("cap") is not None:
+        probability = np.minimum(probability, spec["cap"])
+    smoothing = spec.get("smoothing")
+    if smoothing:
+        weight = smoothing["weight"]
+        probability = (probability * weight) + (smoothing["baseline"] * (1 - weight))
+    return probability
+
+
+def apply(name, raw_probability, display=True):
+    """Adjusted probability, metrics and bands (dict of arrays) for an array of raw scores."""
+    with metrics.timed(name, "adjust"):
+        return _apply(name, raw_probability, display)
+
+
+def _apply(name, raw_probability, display):
+    spec = table(name)
+    probability = adjust(name, raw_probability)
+    result = {"probability": probability}
+    if "display_boosts" in spec:
+        result["display_confidence"] = _boost(probability, spec["display_boosts"])
+    for metric, chain in spec["metrics"].items():
+        value = probability
+        for op, operand in chain:
+            value = _OPS[op](value, operand)
+        result[metric] = value
+    for band, band_spec in spec["bands"].items():
+        if display or not band_spec.get("display"):
+            result[band] = _band(probability, band_spec)
+    return result
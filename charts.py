@@ -0,0 +1,52 @@
+import functools
+import threading
+
+import streamlit as st
+
+# === Prebuilt result charts ===
+# The risk gauge is the same figure for every patient of a model except for its value
+# and bar colour, so each model's gauge is built and validated once per process and a
+# result only patches those two fields before it is sent. The template keeps just the
+# default theme's layout colours and fonts (Streamlit's theme overrides them anyway):
+# the per-trace-type defaults plotly attaches to every figure were ~2/3 of the payload.
+#
+# Patient-independent images (the importance chart) are rendered once per model version
+# by explanations.importance_report.
+
+GAUGES = {
+    "fracture": {"title": "Overall Risk %"},
+    "oa": {"title": "Osteoarthritis Risk %"},
+}
+
+# Layout entries of the default plotly template an Indicator actually uses
+TEMPLATE_LAYOUT = ("font", "paper_bgcolor", "plot_bgcolor", "colorway")
+
+
+@functools.lru_cache(maxsize=None)
+def gauge_figure(name):
+    """(figure, lock): the model's gauge, shared by every session and patched in place."""
+    import plotly.graph_objects as go
+    import plotly.io as pio
+
+    layout = pio.templates[pio.templates.default].layout.to_plotly_json()
+    figure = go.Figure(
+        go.Indicator(
+            mode="gauge+number",
+            value=0,
+            title={'text': GAUGES[name]["title"]},
+            gauge={'axis': {'range': [0, 100]}},
+        ),
+        layout={"template": {"layout": {key: layout[key] for key in TEMPLATE_LAYOUT if key in layout}}},
+    )
+    return figure, threading.Lock()
+
+
+def show_gauge(name, value, color):
+    figure, lock = gauge_figure(name)
+    # Sessions run on their own threads: patch and serialize under the figure's lock.
+    # A Figure (unlike a dict) is passed through by st.plotly_chart without re-validation
+    with lock:
+        with figure.batch_update():
+            figure.data[0].value = value
+            figure.data[0].gauge.bar.color = color
+        st.plotly_chart(figure, use_container_width=True)
@@ -0,0 +1,163 @@
+import pandas as pd
+
+import calibration
+import feature_schema
+import metrics
+import scoring
+from feature_schema import SchemaEncoder
+
+# === Fragility fracture model: shared encoding & risk adjustment ===
+# Used by the Streamlit page (prediction_client) and the batch scorer (batch_client)
+# so a roster row and a form submission go through exactly the same steps: both are
+# encoded by the SchemaEncoder compiled from FRACTURE_SCHEMA.
+
+BOOL_MAP = {"Yes": 1, "No": 0}
+
+# Answer vocabularies — the list position is the code the model was trained on
+GENDERS = ["Female", "Male"]
+EDUCATION_LEVELS = ["Primary", "Secondary", "Tertiary"]
+ETHNICITIES = [
+    "Akwa ibom", "Akwaibom", "Benin", "Efik", "Hausa",
+    "Ife", "Igbo", "Minority ethnic group", "Tiv", "Yoruba"
+]
+AMPUTATION_TYPES = [
+    "Hip Disariculation", "Transtibial Amputation", "Knee Disarticulation", "Transformoral Amputation"
+]
+AMPUTATION_CAUSES = ["Trauma", "Diabetes", "PAD", "Cancer", "Infection"]
+# The form's wording for causes the model knows under another name
+AMPUTATION_CAUSE_ALIASES = {
+    "Vascular Disease": "PAD",
+    "Peripheral Artarial Disease": "PAD",
+    "Tumor/Cancer": "Cancer",
+}
+CHRONIC_DETAILS = [
+    "Arthritis", "Rheumatoid Arthritis", "Osteoarthritis", "Hypertension", "Diabetes", "Peripheral Artarial Disease", "None"
+]
+PROSTHESIS_TYPES = [
+    "Knee Disarticulation Prosthesis", "Transtibial Prosthesis", "Transfermoral (complex) Prosthesis"
+]
+
+AMPUTATION_CAUSE_OPTIONS = [
+    "Trauma", "Vascular Disease", "Tumor/Cancer", "Infection", "Diabetes", "Peripheral Artarial Disease"
+]
+AMPUTATION_CAUSE_CODES = {
+    **{cause: i for i, cause in enumerate(AMPUTATION_CAUSES)},
+    **{alias: AMPUTATION_CAUSES.index(cause) for alias, cause in AMPUTATION_CAUSE_ALIASES.items()},
+}
+
+
+def _yes_no(name, label):
+    return {"name": name, "type": "binary", "label": label, "codes": BOOL_MAP}
+
+
+# Declarative schema in model column order: widgets, validation and encoding all come from here
+FRACTURE_SCHEMA = {
+    "name": "fracture",
+    "version": 1,
+    "fields": [
+        {"name": 'Age', "type": "integer", "label": "Age", "min": 18, "max": 100, "default": 45},
+        {"name": 'Gender', "type": "category", "label": "Gender", "choices": GENDERS},
+        {"name": 'Level of education', "type": "category", "label": "Level of Education", "choices": EDUCATION_LEVELS},
+        {"name": 'Ethnicity', "type": "category", "label": "Ethnicity", "choices": ETHNICITIES},
+        {"name": 'Weight', "type": "number", "label": "Weight (kg)", "min": 30.0, "max": 200.0, "step": 0.5, "widget": "number"},
+        {"name": 'Height', "type": "number", "label": "Height (m)", "min": 1.0, "max": 2.5, "step": 0.01, "widget": "number"},
+        {"name": 'BMI', "type": "derived", "label": "BMI", "derive": "bmi_m", "inputs": ['Weight', 'Height'], "display": True},
+        {"name": 'Bone Density', "type": "number", "label": "Bone Density (T-score)", "min": -4.0, "max": 2.5, "default": -1.0},
+        _yes_no('Osteoporosis Family History', "Osteoporosis Family History"),
+        _yes_no('Have you been diagnosed with osteoporosis?', "Diagnosed with Osteoporosis?"),
+        _yes_no('Osteopenia Family History', "Osteopenia Family History"),
+        _yes_no('Osteopenia Diagnosed', "Diagnosed with Osteopenia?"),
+        {"name": 'What type of amputation?', "type": "category", "label": "Type of Amputation", "choices": AMPUTATION_TYPES},
+        {"name": 'What caused the amputation?', "type": "category", "label": "Cause of Amputation",
+         "choices": AMPUTATION_CAUSE_OPTIONS, "codes": AMPUTATION_CAUSE_CODES},
+        {"name": 'For how long have you been with amputation?', "type": "integer", "label": "Years with Amputation",
+         "min": 0, "max": 60, "default": 6},
+        _yes_no('Glucocorticoid Use', "Glucocorticoid Use?"),
+        _yes_no('Chronic Illnesses', "Chronic Illness / Cormorbidities?"),
+        {"name": 'Chronic Conditions Detail', "type": "category", "label": "Chronic Illness Detail ID", "choices": CHRONIC_DETAILS},
+        _yes_no('Are you taking any supplements(e.g. Calcium, Vitamin D) to support bone health?', "Taking Bone Supplements?"),
+        _yes_no('Gait Difficulty', "Gait Difficulty?"),
+        _yes_no('Have you noticed any changes in your gait or walking pattern?', "Change in Gait?"),
+        _yes_no('Assistive Device Used', "Using Assistive Device?"),
+        _yes_no('Can you perform daily activities (e.g. Bathing, Dressing, Cooking) without difficulties?',
+                "Independent in Daily Activities?"),
+        _yes_no('Do you have any limitations in your range of motion or flexibility?', "Range of Motion Limitations?"),
+        _yes_no('Have you noticed any changes in your ability to perform physical activities (e.g. Walking, Climbing stairs)?',
+                "Activity Performance Change?"),
+        _yes_no('Have you noticed any increase in your pain levels over time?', "Increased Pain Over Time?"),
+        {"name": 'What type of lower limb prosthesis do you use?', "type": "category",
+         "label": "Lower Limb Prosthesis Type (Numeric ID)", "choices": PROSTHESIS_TYPES},
+        _yes_no('Do you have a history of falls while using the prosthetic device?', "History of Falls?"),
+        {"name": 'How long have you been using a prosthetic limb?', "type": "integer", "label": "Years Using Prosthetic Limb",
+         "min": 0, "max": 50, "default": 3},
+        _yes_no('Have you experienced any complications with your prosthetic limb (e.g. Pain, Instability, loose socket fitting, discomfort, misalignment)?',
+                "Complications with Prosthesis (Pain, Discomfort, Loose/Tight fitting)?"),
+        {"name": 'What is your level of activity with the prosthesis?', "type": "category",
+         "label": "Activity Level with Prosthesis (ID)", "choices": [0, 1, 2]},
+        _yes_no('Do you engage in regular exercise (long distance walks e.t.c)?', "Engages in Regular Exercise?"),
+        {"name": 'If yes, for how many minutes do you exercise?', "type": "number", "label": "Minutes of Exercise",
+         "min": 0.0, "max": 120.0, "default": 30.0},
+        _yes_no('Do you smoke?', "Currently Smoke?"),
+        _yes_no('Have you smoked in the past?', "Smoked in the Past?"),
+        _yes_no('Do you take/use tobacco substances?', "Use Tobacco Substances?"),
+        _yes_no('Have you taken/used tobacco substances in the past?', "Used Tobacco in the Past?"),
+        _yes_no('Do you consume alcohol regularly?', "Consume Alcohol Regularly?"),
+        # Rosters may leave these out: the form derives them from other answers
+        {"name": 'Bone Density (T-score)', "type": "derived", "derive": "copy", "inputs": ['Bone Density']},
+        {"name": 'Activity Level', "type": "derived", "derive": "copy",
+         "inputs": ['What is your level of activity with the prosthesis?']},
+    ],
+}
+
+FEATURE_COLUMNS = [field["name"] for field in FRACTURE_SCHEMA["fields"]]
+
+ENCODER = SchemaEncoder(FRACTURE_SCHEMA, FEATURE_COLUMNS)
+
+
+def encode_row(answers):
+    """One form submission (answer dict) as a one-row model frame."""
+    return ENCODER.frame(ENCODER.encode_row(answers))
+
+
+def encode_answers(answers):
+    """Encode raw answers (one row per patient) into the model's feature frame."""
+    return ENCODER.frame(ENCODER.encode(answers), index=answers.index)
+
+
+def encoder_spec():
+    # How answers become model inputs, recorded in the model artifact manifest
+    return {"kind": "client_scoring", "columns": FEATURE_COLUMNS, "schema": feature_schema.to_dict(FRACTURE_SCHEMA)}
+
+
+# === Adaptive confidence adjustment, FRAX-like metrics & bands (calibration table) ===
+def adjust_confidence(raw_probability):
+    return calibration.adjust("fracture", raw_probability)
+
+
+def assess(raw_probability, display=True):
+    return calibration.apply("fracture", raw_probability, display=display)
+
+
+def _results(model, features, index, threshold):
+    # One predict_proba call per chunk; the label is thresholded from the same probabilities
+    threshold = scoring.threshold("fracture") if threshold is None else threshold
+    with metrics.timed("fracture", "model"):
+        raw_probability, prediction = scoring.predict(model, features, threshold)
+
+    results = pd.DataFrame(assess(raw_probability, display=False), index=index)
+    results.insert(0, 'raw_probability', raw_probability)
+    results.insert(0, 'prediction', prediction)
+    results['calibration_version'] = calibration.version("fracture")
+    return results
+
+
+def score_frame(model, answers, threshold=None):
+    # Strict: any invalid answer raises ValueError for the whole frame
+    return _results(model, encode_answers(answers), answers.index, threshold)
+
+
+def score_valid(model, answers, threshold=None):
+    """Score the rows that pass validation: (results for those rows, error report for the rest)."""
+    matrix, valid, errors = ENCODER.validate(answers)
+    index = answers.index[valid]
+    return _results(model, ENCODER.frame(matrix[valid], index=index), index, threshold), errors
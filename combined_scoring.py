@@ -0,0 +1,127 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+import client_scoring
+import feature_schema
+import model_registry
+import partner_scoring
+import scoring
+from client_scoring import FRACTURE_SCHEMA
+from partner_scoring import PARTNER_SCHEMA
+
+# === Combined fracture + osteoarthritis assessment ===
+# One questionnaire scored by both models. Questions the two forms share are asked once,
+# in the fracture form's terms, and translated for the OA model through SHARED; the rest
+# come from each model's own schema. Both models are scored and calibrated at the same
+# time on a small thread pool (each on its own micro-batcher), so a combined assessment
+# takes about as long as the slower model instead of the sum of both.
+
+MODELS = ("fracture", "oa")
+
+# (upper bound, exclusive) -> OA answer; values past the last bound get the default
+AGE_GROUPS = [(18, 'Under 18'), (26, '18-25'), (36, '26-35'), (46, '36-45'), (61, '46-60')]
+DURATION_GROUPS = [(1, '<1 year'), (3, '1-2 years'), (6, '2-5 years')]
+# The OA form only tells trauma and infection apart from other disease
+CAUSE_GROUPS = {"Trauma": "Trauma", "Infection": "Infection"}
+
+
+def _group(bands, default):
+    return lambda value: next((group for upper, group in bands if value < upper), default)
+
+
+CONVERSIONS = {
+    "same": lambda value: value,
+    "age_group": _group(AGE_GROUPS, '60+'),
+    "m_to_cm": lambda metres: round(metres * 100, 1),
+    "years_group": _group(DURATION_GROUPS, '5+ years'),
+    "cause_group": lambda cause: CAUSE_GROUPS.get(cause, "Disease"),
+}
+
+# Fracture answer -> (OA answer, conversion)
+SHARED = {
+    'Age': ('age', "age_group"),
+    'Gender': ('sex', "same"),
+    'Weight': ('weight (kg)', "same"),
+    'Height': ('height (cm)', "m_to_cm"),
+    'What caused the amputation?': ('what caused the amputation?', "cause_group"),
+    'For how long have you been with amputation?': ('for how long have you been with amputation?', "years_group"),
+    'How long have you been using a prosthetic limb?': ('how long have you been using a lower limb prosthesis?', "years_group"),
+    'Chronic Illnesses': ('do you have any other health conditions (e.g, diabetes, rheumatoid arthritis)', "same"),
+    'Do you engage in regular exercise (long distance walks e.t.c)?': ('do you engage in regular exercise?', "same"),
+    'Do you smoke?': ('do you smoke?', "same"),
+}
+OA_SHARED = {oa_name for oa_name, _ in SHARED.values()} | {'body mass index (bmi)'}  # BMI: fill_bmi
+# Shared widgets take the tighter of the two ranges, so an accepted answer is valid for both
+# models (the OA form stops at 220 cm, the fracture form at 2.5 m)
+SHARED_LIMITS = {
+    'Height': {"max": feature_schema.field(PARTNER_SCHEMA, 'height (cm)')["max"] / 100},
+}
+
+
+def _section(schema, name, keep, limits=None):
+    fields = [{**f, **(limits or {}).get(f["name"], {})} for f in schema["fields"] if keep(f["name"])]
+    return {"name": name, "version": schema["version"], "fields": fields}
+
+
+# Form sections, each rendered by form_widgets.render
+SHARED_SCHEMA = _section(FRACTURE_SCHEMA, "combined", lambda name: name in SHARED or name == 'BMI', SHARED_LIMITS)
+SECTIONS = {
+    "fracture": _section(FRACTURE_SCHEMA, "combined_fracture", lambda name: name not in SHARED and name != 'BMI'),
+    "oa": _section(PARTNER_SCHEMA, "combined_oa", lambda name: name not in OA_SHARED),
+}
+
+ASSESS = {"fracture": client_scoring.assess, "oa": partner_scoring.assess}
+
+_pool = ThreadPoolExecutor(max_workers=len(MODELS), thread_name_prefix="combined")
+
+
+def split_answers(answers, models=MODELS):
+    """{model: that model's answer dict} for one combined-form submission."""
+    per_model = {}
+    if "fracture" in models:
+        per_model["fracture"] = {f["name"]: answers[f["name"]] for f in feature_schema.inputs(FRACTURE_SCHEMA)}
+    if "oa" in models:
+        oa = {f["name"]: answers[f["name"]] for f in feature_schema.inputs(SECTIONS["oa"])}
+        for name, (oa_name, conversion) in SHARED.items():
+            oa[oa_name] = CONVERSIONS[conversion](answers[name])
+        per_model["oa"] = partner_scoring.fill_bmi(oa)
+    return per_model
+
+
+def _encode_row(name, answers):
+    if name == "fracture":
+        return client_scoring.encode_row(answers)
+    encoder = partner_scoring.encoder_for(model_registry.get_model("oa"))
+    return encoder.frame(encoder.encode_row(answers))
+
+
+def encode(answers, models=MODELS):
+    """{model: one-row model frame}; a ValueError names every invalid answer of every model."""
+    frames, problems = {}, []
+    for name, model_answers in split_answers(answers, models).items():
+        try:
+            frames[name] = _encode_row(name, model_answers)
+        except ValueError as e:
+            problems.append(f"{name}: {e}")
+    if problems:
+        raise ValueError("; ".join(problems))
+    return frames
+
+
+def key_frame(frames):
+    # All models' inputs side by side, for result_store
+    return pd.concat(list(frames.values()), axis=1)
+
+
+def _assess(name, input_df):
+    return ASSESS[name](scoring.score(name, input_df)["probability"])
+
+
+def score(frames):
+    """Unified result for encode()'s frames: every model scored concurrently, plus the wall time."""
+    start = time.perf_counter()
+    futures = {name: _pool.submit(_assess, name, input_df) for name, input_df in frames.items()}
+    models = {name: {"input_df": frames[name], "assessment": future.result()} for name, future in futures.items()}
+    return {"models": models, "seconds": time.perf_counter() - start}
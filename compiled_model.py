@@ -0,0 +1,230 @@
+import os
+
+import numpy as np
+
+# === Compiled tree-ensemble inference (NumPy only) ===
+# A hybrid model exported by model_compiler is a JSON spec plus flat arrays:
+#
+#   forest / gbdt   node tables for all trees back to back (feature, threshold, left,
+#                   right, default_left, missing, value) and each tree's root offset.
+#                   Leaves point at themselves, so every row walks max_depth steps
+#                   without branching: one vectorized gather per level for all trees.
+#   linear          coef / intercept (logistic regression)
+#   stacking        members' class-1 probabilities fed to a linear final estimator
+#   voting          weighted mean of the members' class-1 probabilities (soft voting)
+#
+# Split semantics follow the source library: scikit-learn compares float32-cast
+# features with <=, XGBoost compares float32 with <, LightGBM compares float64 with <=.
+# This module imports nothing but NumPy, so scoring workers don't need
+# scikit-learn/XGBoost/LightGBM at all. Large batches go through a numba kernel when
+# numba is installed (one compiled loop per row instead of a gather per tree level).
+
+FORMAT = "compiled-tree-model"
+FORMAT_VERSION = 1
+
+# COMPILED_MODEL_NUMBA: "auto" = numba for batches of NUMBA_MIN_ROWS+ rows, "1" = always, "0" = never
+NUMBA_MODE = os.environ.get("COMPILED_MODEL_NUMBA", "auto")
+NUMBA_MIN_ROWS = 256
+
+# missing-value handling per node
+MISSING_NONE = 0   # NaN is treated as 0.0 (LightGBM missing_type "None")
+MISSING_ZERO = 1   # NaN and 0.0 take the default branch (LightGBM missing_type "Zero")
+MISSING_NAN = 2    # NaN takes the default branch (scikit-learn, XGBoost, LightGBM "NaN")
+
+_ZERO_THRESHOLD = 1e-35  # LightGBM's kZeroThreshold
+
+
+def _sigmoid(margin):
+    with np.errstate(over="ignore"):  # exp overflow -> inf -> exactly 0.0, as in scipy's expit
+        return 1.0 / (1.0 + np.exp(-margin))
+
+
+class _TreeTable:
+    def __init__(self, spec, arrays):
+        prefix = spec["arrays"]
+        self.feature = arrays[prefix + "feature"]
+        self.threshold = arrays[prefix + "threshold"]
+        self.left = arrays[prefix + "left"]
+        self.right = arrays[prefix + "right"]
+        self.default_left = arrays[prefix + "default_left"]
+        self.missing = arrays[prefix + "missing"]
+        self.value = arrays[prefix + "value"]
+        self.roots = arrays[prefix + "roots"]
+        self.max_depth = spec["max_depth"]
+        self.strict = spec["op"] == "<"
+        self.x_dtype = np.dtype(spec["x_dtype"])
+        self.simple_missing = bool(np.all(self.missing == MISSING_NAN))
+
+    def _leaves(self, X):
+        nodes = np.repeat(self.roots[None, :], len(X), axis=0)
+        for _ in range(self.max_depth):
+            x = np.take_along_axis(X, self.feature[nodes], axis=1)
+            threshold = self.threshold[nodes]
+            isnan = np.isnan(x)
+            if self.simple_missing:
+                missing = isnan
+            else:
+                kind = self.missing[nodes]
+                x = np.where(isnan & (kind == MISSING_NONE), 0.0, x)
+                missing = np.where(
+                    kind == MISSING_ZERO, isnan | (np.abs(x) <= _ZERO_THRESHOLD), isnan & (kind == MISSING_NAN)
+                )
+            go_left = (x < threshold) if self.strict else (x <= threshold)
+            go_left = np.where(missing, self.default_left[nodes], go_left)
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return nodes
+
+    def leaf_sum(self, X):
+        # Cast the way the source library does before comparing (float32 for sklearn/XGBoost)
+        X = X.astype(self.x_dtype).astype(np.float64)
+        if _use_numba(len(X)):
+            return _numba_leaf_sum(self, X)
+        return self.value[self._leaves(X)].sum(axis=1)
+
+
+class _Forest(_TreeTable):
+    # scikit-learn random forest: mean of the trees' class-1 leaf fractions
+    def __call__(self, X):
+        return self.leaf_sum(X) / len(self.roots)
+
+
+class _GradientBoosting(_TreeTable):
+    # XGBoost / LightGBM binary:logistic: sigmoid(base margin + sum of leaf values)
+    def __init__(self, spec, arrays):
+        super().__init__(spec, arrays)
+        self.base_margin = spec["base_margin"]
+
+    def __call__(self, X):
+        return _sigmoid(self.base_margin + self.leaf_sum(X))
+
+
+class _Linear:
+    def __init__(self, spec, arrays):
+        self.coef = arrays[spec["arrays"] + "coef"]
+        self.intercept = arrays[spec["arrays"] + "intercept"]
+
+    def __call__(self, X):
+        return _sigmoid(X @ self.coef + self.intercept)
+
+
+class _Stacking:
+    def __init__(self, spec, arrays):
+        self.members = [_build(m, arrays) for m in spec["members"]]
+        self.final = _build(spec["final"], arrays)
+        self.passthrough = spec.get("passthrough", False)
+
+    def __call__(self, X):
+        stacked = np.column_stack([member(X) for member in self.members])
+        if self.passthrough:
+            stacked = np.hstack([stacked, X])
+        return self.final(stacked)
+
+
+class _Voting:
+    def __init__(self, spec, arrays):
+        self.members = [_build(m, arrays) for m in spec["members"]]
+        self.weights = spec.get("weights")
+
+    def __call__(self, X):
+        return np.average(np.column_stack([member(X) for member in self.members]), axis=1, weights=self.weights)
+
+
+_KINDS = {
+    "forest": _Forest,
+    "gbdt": _GradientBoosting,
+    "linear": _Linear,
+    "stacking": _Stacking,
+    "voting": _Voting,
+}
+
+
+def _build(spec, arrays):
+    if spec["kind"] not in _KINDS:
+        raise ValueError(f"Unknown compiled estimator kind '{spec['kind']}'")
+    return _KINDS[spec["kind"]](spec, arrays)
+
+
+class CompiledModel:
+    """Binary classifier evaluated from exported node tables; quacks like the original."""
+
+    def __init__(self, spec, arrays):
+        if spec.get("format") != FORMAT:
+            raise ValueError(f"Not a compiled model spec (format={spec.get('format')!r})")
+        if spec.get("format_version", 0) > FORMAT_VERSION:
+            raise ValueError(f"Compiled model format {spec['format_version']} is newer than this reader")
+        self.spec = spec
+        self.arrays = arrays
+        self.feature_names_in_ = np.asarray(spec["feature_names"], dtype=object)
+        self.n_features_in_ = len(self.feature_names_in_)
+        self._feature_list = list(self.feature_names_in_)
+        self.classes_ = np.asarray(spec["classes"])
+        self._root = _build(spec["root"], arrays)
+
+    def _matrix(self, X):
+        if hasattr(X, "columns") and list(X.columns) != self._feature_list:
+            X = X[self._feature_list]
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected {self.n_features_in_} features, got shape {X.shape}")
+        return X
+
+    def predict_proba(self, X):
+        probability = self._root(self._matrix(X))
+        return np.column_stack([1.0 - probability, probability])
+
+    def predict(self, X):
+        return self.classes_[(self.predict_proba(X)[:, 1] > 0.5).astype(int)]
+
+
+# === Optional numba evaluator ===
+_numba_kernel = None
+_numba_missing = False
+
+
+def _use_numba(rows):
+    global _numba_kernel, _numba_missing
+    if NUMBA_MODE == "0" or _numba_missing or (NUMBA_MODE != "1" and rows < NUMBA_MIN_ROWS):
+        return False
+    if _numba_kernel is None:
+        try:
+            _numba_kernel = _compile_kernel()
+        except ImportError:
+            _numba_missing = True
+            return False
+    return True
+
+
+def _numba_leaf_sum(table, X):
+    out = np.zeros(len(X))
+    _numba_kernel(X, table.feature, table.threshold, table.left, table.right, table.default_left,
+                  table.missing, table.value, table.roots, table.strict, out)
+    return out
+
+
+def _compile_kernel():
+    import numba
+
+    @numba.njit(cache=True, nogil=True)
+    def leaf_sum(X, feature, threshold, left, right, default_left, missing, value, roots, strict, out):
+        for i in range(X.shape[0]):
+            total = 0.0
+            for root in roots:
+                node = root
+                while left[node] != node:
+                    x = X[i, feature[node]]
+                    kind = missing[node]
+                    if np.isnan(x) and kind == MISSING_NONE:
+                        x = 0.0
+                    if kind == MISSING_NAN and np.isnan(x):
+                        go_left = default_left[node]
+                    elif kind == MISSING_ZERO and (np.isnan(x) or abs(x) <= _ZERO_THRESHOLD):
+                        go_left = default_left[node]
+                    elif strict:
+                        go_left = x < threshold[node]
+                    else:
+                        go_left = x <= threshold[node]
+                    node = left[node] if go_left else right[node]
+                total += value[node]
+            out[i] = total
+
+    return leaf_sum
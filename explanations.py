@@ -0,0 +1,221 @@
+import io
+import threading
+import warnings
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+import numpy as np
+import pandas as pd
+
+import model_registry
+
+# === Global feature importance & chart cache ===
+# Importance rankings and the "Top 5 Risk Contributors" chart don't depend on the
+# patient, so they are built once per model version (when the registry loads the
+# model) and served from memory. Charts are rendered to PNG bytes on a standalone
+# matplotlib Figure, so no pyplot figures accumulate in long-lived workers.
+
+TOP_N = 5
+
+_reports = {}
+_reports_lock = threading.Lock()
+
+
+def _member_weights(model, members):
+    # Stacking: |final estimator coefficient| per base model; Voting: its weights
+    final = getattr(model, "final_estimator_", None)
+    if final is not None and hasattr(final, "coef_"):
+        coef = np.abs(np.ravel(final.coef_))
+        if len(coef) == len(members):
+            return coef
+    weights = getattr(model, "weights", None)
+    if weights is not None and len(weights) == len(members):
+        return np.asarray(weights, dtype=float)
+    return np.ones(len(members))
+
+
+def global_importances(model, feature_names):
+    """Importance per feature (sorted, summing to 1), or None if the model has none."""
+    if hasattr(model, "feature_importances_"):
+        importances = np.asarray(model.feature_importances_, dtype=float)
+    else:
+        # Hybrid ensembles: weighted mean over the fitted members that expose importances
+        members = list(getattr(model, "estimators_", []))
+        weights = _member_weights(model, members)
+        parts = [
+            (w, np.asarray(m.feature_importances_, dtype=float))
+            for m, w in zip(members, weights)
+            if hasattr(m, "feature_importances_")
+        ]
+        if not parts:
+            return None
+        importances = sum(w * p / (p.sum() or 1.0) for w, p in parts) / sum(w for w, _ in parts)
+    total = importances.sum()
+    if total > 0:
+        importances = importances / total
+    return pd.Series(importances, index=list(map(str, feature_names))).sort_values(ascending=False)
+
+
+def render_chart(top_features):
+    from matplotlib.figure import Figure
+
+    fig = Figure()
+    ax = fig.subplots()
+    top_features.plot(kind='barh', color="orange", ax=ax)
+    ax.invert_yaxis()
+    ax.set_xlabel("Importance")
+    ax.set_title(f"Top {len(top_features)} Risk Contributors")
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", bbox_inches="tight")
+    fig.clear()
+    return buffer.getvalue()
+
+
+def _build_report(model):
+    feature_names = getattr(model, "feature_names_in_", None)
+    if feature_names is None:
+        return None
+    ranking = global_importances(model, feature_names)
+    if ranking is None:
+        return None
+    top = ranking.head(TOP_N)
+    return {"ranking": ranking, "top": top, "chart_png": render_chart(top)}
+
+
+def _store(name, model):
+    key = (name, model_registry.loaded_version(name))
+    report = _build_report(model)
+    with _reports_lock:
+        for old in [k for k in _reports if k[0] == name and k != key]:
+            del _reports[old]
+        _reports[key] = report
+    return report
+
+
+def importance_report(name):
+    """Cached {"ranking", "top", "chart_png"} for a registry model, or None if unsupported."""
+    model = model_registry.get_model(name)
+    key = (name, model_registry.loaded_version(name))
+    with _reports_lock:
+        if key in _reports:
+            return _reports[key]
+    return _store(name, model)
+
+
+# === Per-patient SHAP contributions ===
+# One TreeExplainer per tree member, built once per model version and reused.
+# Hybrid ensembles are explained member by member: margin-space (log-odds) SHAP
+# values are mapped onto the probability scale with p * (1 - p), then combined with
+# the ensemble's weights (stacker coefficients or voting weights). For ensembles this
+# is an approximation of the final probability's attribution; members TreeExplainer
+# can't handle (e.g. a LogisticRegression voter) are left out.
+
+EXPLAIN_BUDGET_MS = 300
+
+_explainers = {}
+_explainers_lock = threading.Lock()
+_explain_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="shap")
+
+
+def _signed_member_weights(model, members):
+    final = getattr(model, "final_estimator_", None)
+    if final is not None and hasattr(final, "coef_"):
+        coef = np.ravel(final.coef_)
+        if len(coef) == len(members):
+            return coef
+    return _member_weights(model, members)
+
+
+class ModelExplainer:
+    def __init__(self, model):
+        import shap
+
+        self.feature_names = [str(c) for c in model.feature_names_in_]
+        members = list(getattr(model, "estimators_", None) or [])
+        if members and not hasattr(model, "feature_importances_"):
+            weights = _signed_member_weights(model, members)
+            weights = weights / (np.abs(weights).sum() or 1.0)
+        else:
+            # A single tree model (e.g. a random forest) is explained as a whole
+            members, weights = [model], [1.0]
+
+        self._members = []
+        for member, weight in zip(members, weights):
+            try:
+                explainer = shap.TreeExplainer(member)
+            except Exception:
+                continue
+            self._members.append((member, explainer, float(weight)))
+        if not self._members:
+            raise ValueError(f"No tree-based members to explain in {type(model).__name__}")
+
+    def explain(self, X):
+        """SHAP contributions toward class 1, shape (rows, features), one vectorized pass per member."""
+        X = pd.DataFrame(np.asarray(X, dtype=float), columns=self.feature_names)
+        total = np.zeros(X.shape)
+        for member, explainer, weight in self._members:
+            values = explainer.shap_values(X, check_additivity=False)
+            if isinstance(values, list):
+                values = values[1]
+            values = np.asarray(values)
+            if values.ndim == 3:
+                values = values[..., 1]
+            if _explains_margin(explainer):
+                p = member.predict_proba(X)[:, 1]
+                values = values * (p * (1 - p))[:, None]
+            total += weight * values
+        return total
+
+
+def _explains_margin(explainer):
+    # Boosted trees are explained in log-odds; sklearn forests already in probability
+    return explainer.model.model_type in ("xgboost", "lightgbm", "catboost")
+
+
+def get_explainer(name):
+    model = model_registry.get_model(name)
+    key = (name, model_registry.loaded_version(name))
+    with _explainers_lock:
+        explainer = _explainers.get(key)
+        if explainer is None:
+            for old in [k for k in _explainers if k[0] == name]:
+                del _explainers[old]
+            explainer = _explainers[key] = ModelExplainer(model)
+    return explainer
+
+
+def explain_batch(name, X):
+    """Contributions for many rows at once, as a DataFrame in the model's column order."""
+    explainer = get_explainer(name)
+    index = X.index if isinstance(X, pd.DataFrame) else None
+    return pd.DataFrame(explainer.explain(X), columns=explainer.feature_names, index=index)
+
+
+def explain_patient(name, X, budget_ms=EXPLAIN_BUDGET_MS):
+    """Sorted contributions for one encoded row, or None if it doesn't finish within the budget."""
+    future = _explain_pool.submit(explain_batch, name, X)
+    try:
+        contributions = future.result(timeout=budget_ms / 1000)
+    except TimeoutError:
+        return None  # keeps running in the background; the explainer is warm next time
+    except Exception as e:
+        # No shap, nothing tree-based or a SHAP failure: the score is still shown, without a breakdown
+        warnings.warn(f"No explanation for model '{name}': {type(e).__name__}: {e}")
+        return None
+    return contributions.iloc[0].sort_values(key=np.abs, ascending=False)
+
+
+def top_risk_factors(contributions, n=TOP_N):
+    """The n features pushing this patient's risk up the most."""
+    return contributions[contributions > 0].sort_values(ascending=False).head(n)
+
+
+def _on_load(name, model):
+    _store(name, model)
+    try:
+        get_explainer(name)
+    except (ImportError, ValueError):
+        pass  # no shap, or nothing tree-based: the pages just skip the breakdown
+
+
+# Precompute as soon as a model is (re)loaded, e.g. by the background warm-up
+model_registry.registry.on_load(_on_load)
@@ -0,0 +1,315 @@
+import numpy as np
+import pandas as pd
+
+import metrics
+
+# === Declarative feature schemas ===
+# A schema lists every answer a model needs, in form order, as plain data:
+#
+#   {"name": ..., "type": ..., "label": widget label, ...}
+#
+#   number     float; optional "min"/"max" (validated), "default", "step"
+#   integer    like number, whole values only
+#   category   "choices" (list: the position is the code) or "codes" ({answer: code})
+#   binary     Yes/No with "codes" (defaults to BINARY_CODES)
+#   onehot     "choices"; written as "<name>_<answer>" indicator columns (pd.get_dummies
+#              naming). Answers the model has no column for encode as all zeros.
+#   derived    computed from other answers ("derive": key of DERIVATIONS, "inputs": [...])
+#              unless the answers already carry the column
+#
+# "widget" ("slider" or "number"), "widget_args" and "display" (show a derived value
+# under its inputs) only affect the form (form_widgets.render).
+#
+# SchemaEncoder compiles a schema once into per-column lookup tables: one dict lookup
+# per answer for a form submission, and one vectorized map/compare per column for a
+# batch, shared by the pages, batch scoring and the API.
+
+BINARY_CODES = {"Yes": 1, "No": 0}
+
+DERIVATIONS = {
+    "bmi_m": lambda weight, height_m: np.round(weight / height_m ** 2, 2),
+    "copy": lambda value: value,
+}
+
+
+def _codes(field):
+    if field["type"] == "binary":
+        return field.get("codes", BINARY_CODES)
+    if "codes" in field:
+        return field["codes"]
+    return {choice: i for i, choice in enumerate(field["choices"])}
+
+
+def choices(field):
+    """Options offered by the form for a category/binary/onehot field."""
+    if "choices" in field:
+        return list(field["choices"])
+    return list(_codes(field))
+
+
+def vocabulary(field):
+    """Answers the encoder accepts for a category/binary/onehot field."""
+    if field["type"] == "onehot":
+        return list(field["choices"])
+    return list(_codes(field))
+
+
+def inputs(schema):
+    # Fields the user answers (everything except derived columns)
+    return [field for field in schema["fields"] if field["type"] != "derived"]
+
+
+def field(schema, name):
+    for f in schema["fields"]:
+        if f["name"] == name:
+            return f
+    raise KeyError(f"No field '{name}' in schema '{schema['name']}'")
+
+
+def derive(schema, name, answers):
+    spec = field(schema, name)
+    return DERIVATIONS[spec["derive"]](*(answers[source] for source in spec["inputs"]))
+
+
+def to_dict(schema):
+    # JSON-friendly copy (for artifact manifests)
+    return {
+        "name": schema["name"],
+        "version": schema["version"],
+        "fields": [
+            {**f, "codes": {str(k): v for k, v in _codes(f).items()}} if f["type"] in ("category", "binary") else dict(f)
+            for f in schema["fields"]
+        ],
+    }
+
+
+# === Error reports ===
+# One row per failed check; a patient with several bad answers appears several times.
+REPORT_COLUMNS = ["row", "column", "value", "reason"]
+
+
+def describe(report):
+    """One-line summary of an error report (for exceptions and logs)."""
+    summary = report.groupby(["column", "reason"], sort=False)["value"].agg(lambda v: sorted(set(map(str, v)))[:5])
+    details = "; ".join(f"'{column}' {reason}: {values}" for (column, reason), values in summary.items())
+    return f"{len(report)} invalid answer(s) in {report['row'].nunique()} row(s) — {details}"
+
+
+def row_errors(report):
+    """Error report collapsed to one "column: reason" string per row."""
+    return (report["column"] + ": " + report["reason"]).groupby(report["row"], sort=False).agg("; ".join)
+
+
+# === Compiled encoder ===
+def _code_of(value, codes, code_values):
+    # Answer -> code, accepting answers that already are a code (numeric, or numeric text
+    # as read from a CSV, e.g. "2" for activity level 2); NaN if neither
+    code = codes.get(value)
+    if code is not None:
+        return code
+    if isinstance(value, str):
+        try:
+            value = float(value)
+        except ValueError:
+            return np.nan
+        code = codes.get(value)
+        if code is not None:
+            return code
+    if isinstance(value, (int, float, np.number)) and not isinstance(value, bool) and value in code_values:
+        return value
+    return np.nan
+
+
+def _lookup(values, table):
+    # Look up each distinct answer once, then broadcast back over the rows
+    codes, uniques = pd.factorize(values)
+    mapped = np.array([table(value) for value in uniques] + [np.nan], dtype=float)
+    return mapped[codes], codes == -1
+
+
+class SchemaEncoder:
+    """Compiled encoder for one schema and (optionally) a model's feature_names_in_."""
+
+    def __init__(self, schema, feature_names=None):
+        self.schema = schema
+        if feature_names is None:
+            feature_names = [f["name"] for f in schema["fields"] if f["type"] != "onehot"]
+        self.feature_names = [str(name) for name in feature_names]
+        self.n_features = len(self.feature_names)
+        index = {name: i for i, name in enumerate(self.feature_names)}
+
+        self._numbers = []   # (name, pos, min, max, integer)
+        self._coded = []     # (name, pos, {answer: code}, code values)
+        self._onehot = []    # (name, {answer: pos}, allowed answers)
+        self._derived = []   # (name, pos, derivation, inputs)
+        for f in schema["fields"]:
+            name, kind = f["name"], f["type"]
+            if kind == "onehot":
+                prefix = name + "_"
+                positions = {n[len(prefix):]: i for n, i in index.items() if n.startswith(prefix)}
+                self._onehot.append((name, positions, set(map(str, f["choices"])) | set(positions)))
+            elif name not in index:
+                continue  # this model doesn't use the answer
+            elif kind in ("number", "integer"):
+                self._numbers.append((name, index[name], f.get("min"), f.get("max"), kind == "integer"))
+            elif kind in ("category", "binary"):
+                codes = _codes(f)
+                self._coded.append((name, index[name], codes, set(codes.values())))
+            elif kind == "derived":
+                self._derived.append((name, index[name], DERIVATIONS[f["derive"]], f["inputs"]))
+            else:
+                raise ValueError(f"Unknown field type '{kind}' for '{name}'")
+        self.required = [name for name, *_ in self._numbers + self._coded + self._onehot]
+
+    # --- one form submission ---
+    def encode_row(self, answers):
+        """(1, n_features) row for one answer dict; ValueError listing every bad answer."""
+        with metrics.timed(self.schema["name"], "encode"):
+            return self._encode_row(answers)
+
+    def _encode_row(self, answers):
+        row = np.zeros((1, self.n_features))
+        problems = []
+        for name, pos, low, high, integer in self._numbers:
+            value = answers.get(name)
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                problems.append(f"'{name}' must be a number, got {value!r}")
+                continue
+            if np.isnan(value) or (low is not None and value < low) or (high is not None and value > high) \
+                    or (integer and not value.is_integer()):
+                problems.append(f"'{name}' out of range: {value!r}")
+                continue
+            row[0, pos] = value
+        for name, pos, codes, code_values in self._coded:
+            value = answers.get(name)
+            code = _code_of(value, codes, code_values)
+            if code != code:  # NaN: not an answer or code of this field
+                problems.append(f"Unknown value for '{name}': {value!r}")
+                continue
+            row[0, pos] = code
+        for name, positions, allowed in self._onehot:
+            value = str(answers.get(name))
+            if value not in allowed:
+                problems.append(f"Unknown value for '{name}': {value!r}")
+                continue
+            pos = positions.get(value)
+            if pos is not None:
+                row[0, pos] = 1.0
+        if problems:
+            raise ValueError("; ".join(problems))
+        for name, pos, derivation, sources in self._derived:
+            value = answers.get(name)
+            if value is None:
+                value = derivation(*(row[0, self.feature_names.index(s)] if s in self.feature_names
+                                     else float(answers[s]) for s in sources))
+            row[0, pos] = value
+        return row
+
+    # --- whole batches ---
+    def _evaluate(self, answers):
+        # Encoded matrix plus (row mask, column, reason) for every failed check
+        if isinstance(answers, dict):
+            answers = pd.DataFrame(answers)
+        n_rows = len(answers)
+        matrix = np.zeros((n_rows, self.n_features))
+        failures = []
+
+        missing_columns = [name for name in self.required if name not in answers.columns]
+        for name in missing_columns:
+            failures.append((np.ones(n_rows, dtype=bool), name, "missing column"))
+
+        for name, pos, low, high, integer in self._numbers:
+            if name in missing_columns:
+                continue
+            raw = answers[name]
+            values = pd.to_numeric(raw, errors="coerce").to_numpy(dtype=float)
+            nan = np.isnan(values)
+            absent = raw.isna().to_numpy()
+            failures.append((absent, name, "missing value"))
+            failures.append((nan & ~absent, name, "not a number"))
+            bad = np.zeros(n_rows, dtype=bool)
+            if low is not None:
+                bad |= values < low
+            if high is not None:
+                bad |= values > high
+            if integer:
+                bad |= ~nan & (values != np.round(values))
+            failures.append((bad, name, f"out of range [{low}, {high}]"))
+            matrix[:, pos] = np.where(nan, 0.0, values)
+
+        for name, pos, codes, code_values in self._coded:
+            if name in missing_columns:
+                continue
+            # Rosters may already carry the numeric codes — those pass straight through
+            values, absent = _lookup(answers[name], lambda v: _code_of(v, codes, code_values))
+            failures.append((absent, name, "missing value"))
+            failures.append((~absent & np.isnan(values), name, f"unknown value (expected one of {list(codes)})"))
+            matrix[:, pos] = np.where(np.isnan(values), 0.0, values)
+
+        for name, positions, allowed in self._onehot:
+            if name in missing_columns:
+                continue
+            # -1: no model column for this answer (stays all zeros), nan: not an accepted answer
+            rows, absent = _lookup(answers[name], lambda v: positions.get(str(v), -1) if str(v) in allowed else np.nan)
+            failures.append((absent, name, "missing value"))
+            failures.append((~absent & np.isnan(rows), name, "unknown value"))
+            hit = np.flatnonzero(rows >= 0)
+            matrix[hit, rows[hit].astype(int)] = 1.0
+
+        for name, pos, derivation, sources in self._derived:
+            if all(s in self.feature_names for s in sources):
+                computed = derivation(*(matrix[:, self.feature_names.index(s)] for s in sources))
+            elif all(s in answers.columns for s in sources):
+                computed = derivation(*(pd.to_numeric(answers[s], errors="coerce").to_numpy(dtype=float) for s in sources))
+            else:
+                computed = np.full(n_rows, np.nan)
+            if name in answers.columns:
+                # A value the roster supplies wins; blanks fall back to the derivation
+                supplied = pd.to_numeric(answers[name], errors="coerce").to_numpy(dtype=float)
+                computed = np.where(np.isnan(supplied), computed, supplied)
+            failures.append((np.isnan(computed), name, "missing value"))
+            matrix[:, pos] = computed
+
+        return matrix, [(mask, name, reason) for mask, name, reason in failures if mask.any()]
+
+    def check(self, answers):
+        """Every failed check as a DataFrame: row (index label), column, value, reason."""
+        _, failures = self._evaluate(answers)
+        return self._report(answers, failures)
+
+    def validate(self, answers):
+        """Encode every row at once: (matrix, valid row mask, error report for the other rows)."""
+        with metrics.timed(self.schema["name"], "encode"):
+            matrix, failures = self._evaluate(answers)
+        valid = np.ones(len(matrix), dtype=bool)
+        for mask, _, _ in failures:
+            valid &= ~mask
+        return matrix, valid, self._report(answers, failures)
+
+    def _report(self, answers, failures):
+        if isinstance(answers, dict):
+            answers = pd.DataFrame(answers)
+        parts = []
+        for mask, name, reason in failures:
+            rows = np.flatnonzero(mask)
+            values = answers[name].to_numpy()[rows] if name in answers.columns else [None] * len(rows)
+            parts.append(pd.DataFrame({
+                "row": answers.index[rows], "column": name, "value": values, "reason": reason,
+            }))
+        if not parts:
+            return pd.DataFrame(columns=REPORT_COLUMNS)
+        return pd.concat(parts, ignore_index=True).sort_values("row", kind="stable", ignore_index=True)
+
+    def encode(self, answers):
+        """Vectorized encode of a DataFrame (or dict of columns); ValueError if any row fails a check."""
+        with metrics.timed(self.schema["name"], "encode"):
+            matrix, failures = self._evaluate(answers)
+        if failures:
+            raise ValueError(describe(self._report(answers, failures)))
+        return matrix
+
+    def frame(self, matrix, index=None):
+        # Models were fitted on DataFrames; wrapping keeps feature-name checks happy without copying
+        return pd.DataFrame(matrix, columns=self.feature_names, index=index, copy=False)
@@ -0,0 +1,33 @@
+import streamlit as st
+
+import feature_schema
+
+# === Schema-driven form ===
+# One widget per input field of a feature schema, in schema order. Returns the raw
+# answers dict the schema's encoder expects, so the pages never hand-code columns.
+
+
+def _number(field):
+    kwargs = {"min_value": field.get("min"), "max_value": field.get("max")}
+    if "default" in field:
+        kwargs["value"] = field["default"]
+    if "step" in field:
+        kwargs["step"] = field["step"]
+    kwargs.update(field.get("widget_args", {}))
+    if field.get("widget", "slider") == "number":
+        return st.number_input(field["label"], **kwargs)
+    return st.slider(field["label"], **kwargs)
+
+
+def render(schema):
+    answers = {}
+    for field in schema["fields"]:
+        if field["type"] in ("number", "integer"):
+            answers[field["name"]] = _number(field)
+        elif field["type"] == "derived":
+            if field.get("display"):
+                value = feature_schema.derive(schema, field["name"], answers)
+                st.markdown(f"**{field['label']}:** `{value}`")
+        else:
+            answers[field["name"]] = st.selectbox(field["label"], feature_schema.choices(field))
+    return answers
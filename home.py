@@ -1,8 +1,84 @@
+import os
+import threading
 import streamlit as st
 from PIL import Image
-import requests
 from io import BytesIO
 
+# === Hero image ===
+# The bundled asset is served by default, so the landing page never waits on the
+# network. The Unsplash photo is fetched once per process in a background thread
+# (strict timeout) and kept on disk; once it's there, later renders use it. Decoded,
+# resized bytes are cached across sessions with st.cache_data.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+HERO_URL = "https://images.unsplash.com/photo-1611782373786-2c723b1b531b?auto=format&fit=crop&w=800&q=80"
+HERO_ASSET = os.path.join(BASE_DIR, "assets", "knee.webp")
+HERO_CACHE = os.path.join(os.environ.get("HERO_CACHE_DIR", os.path.join(BASE_DIR, ".cache")), "hero.webp")
+HERO_FETCH = os.environ.get("HERO_FETCH", "1") != "0"  # set HERO_FETCH=0 behind egress-restricted networks
+FETCH_TIMEOUT = 3.0  # seconds (connect and read)
+MAX_WIDTH = 800
+
+_fetch_started = False
+_fetch_lock = threading.Lock()
+
+
+def _encode(data):
+    img = Image.open(BytesIO(data))
+    img.thumbnail((MAX_WIDTH, MAX_WIDTH))
+    buffer = BytesIO()
+    img.convert("RGB").save(buffer, format="WEBP", quality=85)
+    return buffer.getvalue()
+
+
+def _fetch_remote():
+    import requests
+
+    try:
+        response = requests.get(HERO_URL, timeout=FETCH_TIMEOUT)
+        response.raise_for_status()
+        data = _encode(response.content)
+    except Exception:
+        return  # offline or blocked: keep serving the bundled asset
+    tmp_path = f"{HERO_CACHE}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(HERO_CACHE), exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, HERO_CACHE)
+    except OSError:
+        # Read-only checkout or cache dir: keep serving the bundled asset
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+def _start_fetch():
+    global _fetch_started
+    with _fetch_lock:
+        if _fetch_started:
+            return
+        _fetch_started = True
+    threading.Thread(target=_fetch_remote, name="hero-image", daemon=True).start()
+
+
+@st.cache_data(show_spinner=False)
+def _load_image(path, mtime_ns):
+    # mtime_ns is only part of the cache key, so a refreshed file is re-read
+    with open(path, "rb") as f:
+        return _encode(f.read())
+
+
+def hero_image():
+    path = HERO_CACHE if os.path.exists(HERO_CACHE) else HERO_ASSET
+    if path == HERO_ASSET and HERO_FETCH:
+        _start_fetch()
+    try:
+        return _load_image(path, os.stat(path).st_mtime_ns)
+    except (OSError, ValueError):
+        return _load_image(HERO_ASSET, os.stat(HERO_ASSET).st_mtime_ns)
+
+
 def show():
     # Title
     st.markdown(
@@ -16,15 +92,8 @@ def show():
 
     st.divider()
 
-    # Load and Show Image
-    try:
-        url = "https://images.unsplash.com/photo-1611782373786-2c723b1b531b?auto=format&fit=crop&w=800&q=80"
-        response = requests.get(url)
-        img = Image.open(BytesIO(response.content))
-    except:
-        img = Image.open("assets/knee.webp")
-
-    st.image(img, caption="🦴 Joint Health Matters", use_container_width=True)
+    # Show Image (bundled asset, or the cached remote copy once fetched)
+    st.image(hero_image(), caption="🦴 Joint Health Matters", use_container_width=True)
 
     st.divider()
 
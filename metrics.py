@@ -0,0 +1,141 @@
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# === Hot-path instrumentation ===
+# In-memory latency histograms and error counters per (model, stage), exposed in
+# the Prometheus text format, so latency regressions show up in production without
+# attaching a profiler. Stages, in request order:
+#
+#   widgets   form widgets -> answers dict (pages)
+#   encode    answers -> model feature matrix (SchemaEncoder)
+#   model     predict_proba
+#   adjust    confidence adjustment, metrics and bands (calibration.apply)
+#   chart     gauge and importance charts (pages)
+#   explain   per-patient contributions (pages)
+#   render    the whole page script run (pages)
+#
+#   METRICS_PORT=9464 streamlit run app.py     # then GET http://127.0.0.1:9464/metrics
+#   GET /metrics on scoring_service and async_service
+
+# Seconds; tuned for a per-request hot path (sub-millisecond encodes up to slow page renders)
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PREFIX = "prediction"
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last: above the largest bucket (+Inf)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def cumulative(self):
+        total, out = 0, []
+        for count in self.counts:
+            total += count
+            out.append(total)
+        return out
+
+
+class Metrics:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self._histograms = {}  # (model, stage) -> Histogram
+        self._errors = {}      # (model, stage) -> count
+        self._lock = threading.Lock()
+
+    def observe(self, model, stage, seconds):
+        with self._lock:
+            histogram = self._histograms.get((model, stage))
+            if histogram is None:
+                histogram = self._histograms[(model, stage)] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def error(self, model, stage):
+        with self._lock:
+            self._errors[(model, stage)] = self._errors.get((model, stage), 0) + 1
+
+    @contextmanager
+    def timed(self, model, stage):
+        # Failed calls count as errors, not as latency samples
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.error(model, stage)
+            raise
+        self.observe(model, stage, time.perf_counter() - start)
+
+    def exposition(self):
+        """Prometheus text format (version 0.0.4)."""
+        name = f"{PREFIX}_stage_seconds"
+        lines = [
+            f"# HELP {name} Time spent in each stage of a prediction.",
+            f"# TYPE {name} histogram",
+        ]
+        with self._lock:
+            for (model, stage), histogram in sorted(self._histograms.items()):
+                labels = f'model="{model}",stage="{stage}"'
+                for le, count in zip([*map(repr, self.buckets), "+Inf"], histogram.cumulative()):
+                    lines.append(f'{name}_bucket{{{labels},le="{le}"}} {count}')
+                lines.append(f"{name}_sum{{{labels}}} {histogram.sum!r}")
+                lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+            errors = sorted(self._errors.items())
+        name = f"{PREFIX}_stage_errors_total"
+        lines += [f"# HELP {name} Stage calls that raised.", f"# TYPE {name} counter"]
+        for (model, stage), count in errors:
+            lines.append(f'{name}{{model="{model}",stage="{stage}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+            self._errors.clear()
+
+
+metrics = Metrics()
+timed = metrics.timed
+observe = metrics.observe
+exposition = metrics.exposition
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# --- local endpoint ---
+class MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        payload = exposition().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_server(port=None, host="127.0.0.1"):
+    # Once per process (Streamlit reruns app.py on every interaction); METRICS_PORT by default
+    global _server
+    port = int(port if port is not None else os.environ.get("METRICS_PORT", 9464))
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), MetricsHandler)
+            threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+    return _server
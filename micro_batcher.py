@@ -0,0 +1,136 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+import pandas as pd
+
+import model_registry
+
+# === Micro-batching in front of predict_proba ===
+# Concurrent single-patient requests for the same model are gathered for up to
+# MAX_WAIT_MS (or MAX_BATCH_ROWS rows) and scored with one vectorized
+# predict_proba call; each caller gets its own rows back. A batcher quacks like
+# the model (predict_proba + classes_), so it can be passed wherever a model is.
+
+MAX_BATCH_ROWS = int(os.environ.get("MICRO_BATCH_MAX_ROWS", 64))
+MAX_WAIT_MS = float(os.environ.get("MICRO_BATCH_WAIT_MS", 2.0))
+# Upper bound on waiting for a batch: a wedged model fails the request instead of hanging it
+RESULT_TIMEOUT_SECONDS = float(os.environ.get("MICRO_BATCH_TIMEOUT", 30.0))
+
+_STOP = object()
+
+
+class BatcherClosed(RuntimeError):
+    """Raised by submit() once the batcher was replaced (its model reloaded)."""
+
+
+class MicroBatcher:
+    def __init__(self, model, max_batch_rows=None, max_wait_ms=None):
+        self.model = model
+        self.classes_ = model.classes_
+        self.max_batch_rows = max_batch_rows or MAX_BATCH_ROWS
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else MAX_WAIT_MS) / 1000
+        feature_names = getattr(model, "feature_names_in_", None)
+        self._columns = [str(c) for c in feature_names] if feature_names is not None else None
+        self._queue = queue.Queue()
+        self._closed = False
+        self._close_lock = threading.Lock()
+        self.batches = 0
+        self.rows = 0
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, X):
+        rows = np.asarray(X, dtype=float).reshape(-1, self._n_features(X))
+        future = Future()
+        # Nothing can be queued behind _STOP: the worker would never pick it up
+        with self._close_lock:
+            if self._closed:
+                raise BatcherClosed("micro-batcher is closed")
+            self._queue.put((rows, future))
+        return future
+
+    def predict_proba(self, X, timeout=None):
+        return self.submit(X).result(RESULT_TIMEOUT_SECONDS if timeout is None else timeout)
+
+    def close(self):
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._thread.join()
+
+    def _n_features(self, X):
+        return len(self._columns) if self._columns is not None else np.shape(X)[-1]
+
+    def _collect(self, first):
+        batch, rows = [first], len(first[0])
+        deadline = time.perf_counter() + self.max_wait
+        while rows < self.max_batch_rows:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+            rows += len(item[0])
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            batch = self._collect(first)
+            matrix = np.vstack([rows for rows, _ in batch])
+            try:
+                X = pd.DataFrame(matrix, columns=self._columns, copy=False) if self._columns else matrix
+                proba = self.model.predict_proba(X)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.rows += len(matrix)
+            start = 0
+            for rows, future in batch:
+                future.set_result(proba[start:start + len(rows)])
+                start += len(rows)
+
+
+_batchers = {}
+_batchers_lock = threading.Lock()
+
+
+def get_batcher(name):
+    # One batcher per registry model, created on first use and replaced when the
+    # registry reloads a changed model file
+    model = model_registry.get_model(name)
+    batcher = _batchers.get(name)
+    if batcher is None or batcher.model is not model:
+        with _batchers_lock:
+            batcher = _batchers.get(name)
+            if batcher is None or batcher.model is not model:
+                if batcher is not None:
+                    batcher.close()
+                batcher = _batchers[name] = MicroBatcher(model)
+    return batcher
+
+
+def predict_proba(name, X):
+    # A caller can still hold the batcher get_batcher() just replaced: retry on the current one
+    while True:
+        try:
+            return get_batcher(name).predict_proba(X)
+        except BatcherClosed:
+            continue
@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+import compiled_model
+
+# === Versioned, memory-mappable model artifacts ===
+# A compiled model (see model_compiler) written as a directory:
+#
+#   <stem>.artifact/
+#     manifest.json     format version, model spec (features, classes, ensemble layout),
+#                       answer encoder, decision threshold, calibration version, the
+#                       source pickle's sha256, and a sha256 per array + overall checksum
+#     arrays/*.npy      one uncompressed .npy per node-table array
+#
+# Arrays are opened with np.load(mmap_mode="r"): loading is a few small reads, nothing
+# is unpickled, and every worker process maps the same page-cache pages instead of
+# holding its own copy. Checksums are verified on load (MODEL_ARTIFACT_VERIFY=0 skips).
+
+FORMAT = "model-artifact"
+FORMAT_VERSION = 1
+MANIFEST = "manifest.json"
+SUFFIX = ".artifact"
+
+VERIFY = os.environ.get("MODEL_ARTIFACT_VERIFY", "1") != "0"
+
+
+class ArtifactError(ValueError):
+    pass
+
+
+def artifact_path(pickle_path):
+    return os.path.splitext(pickle_path)[0] + SUFFIX
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _checksum(model_spec, array_digests):
+    digest = hashlib.sha256(json.dumps(model_spec, sort_keys=True).encode())
+    for name in sorted(array_digests):
+        digest.update(f"{name}:{array_digests[name]}".encode())
+    return digest.hexdigest()
+
+
+def write(model, path, source=None, encoder=None, threshold=None, calibration_version=None):
+    """Write a CompiledModel as an artifact directory (replacing any previous one)."""
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(os.path.join(tmp_path, "arrays"))
+
+    arrays = {}
+    for name, array in model.arrays.items():
+        relative = os.path.join("arrays", f"{name}.npy")
+        np.save(os.path.join(tmp_path, relative), np.ascontiguousarray(array), allow_pickle=False)
+        arrays[name] = {
+            "file": relative,
+            "dtype": str(array.dtype),
+            "shape": list(np.shape(array)),
+            "sha256": _sha256(os.path.join(tmp_path, relative)),
+        }
+
+    manifest = {
+        "format": FORMAT,
+        "format_version": FORMAT_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "source": {"file": os.path.basename(source), "sha256": _sha256(source)} if source else None,
+        "model": model.spec,
+        "encoder": encoder,
+        "threshold": threshold,
+        "calibration_version": calibration_version,
+        "arrays": arrays,
+        "checksum": _checksum(model.spec, {name: a["sha256"] for name, a in arrays.items()}),
+    }
+    # Manifest last, so a half-written directory never looks complete
+    with open(os.path.join(tmp_path, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    old_path = f"{path}.old-{os.getpid()}"
+    if os.path.exists(path):
+        os.replace(path, old_path)
+    os.replace(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+    return manifest
+
+
+def read_manifest(path):
+    try:
+        with open(os.path.join(path, MANIFEST)) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"No model artifact at {path}") from None
+    if manifest.get("format") != FORMAT:
+        raise ArtifactError(f"{path} is not a model artifact")
+    if manifest.get("format_version", 0) > FORMAT_VERSION:
+        raise ArtifactError(f"{path} uses artifact format {manifest['format_version']}, newer than this reader")
+    return manifest
+
+
+def verify(path, manifest=None):
+    """Re-hash every array file against the manifest; raises ArtifactError on any mismatch."""
+    manifest = manifest or read_manifest(path)
+    digests = {}
+    for name, entry in manifest["arrays"].items():
+        digests[name] = _sha256(os.path.join(path, entry["file"]))
+        if digests[name] != entry["sha256"]:
+            raise ArtifactError(f"Checksum mismatch for array '{name}' in {path}")
+    if _checksum(manifest["model"], digests) != manifest["checksum"]:
+        raise ArtifactError(f"Manifest checksum mismatch in {path}")
+    return manifest
+
+
+def load(path, verify_checksums=None):
+    """CompiledModel backed by read-only memory maps; .manifest carries the metadata."""
+    manifest = read_manifest(path)
+    if VERIFY if verify_checksums is None else verify_checksums:
+        verify(path, manifest)
+
+    arrays = {}
+    for name, entry in manifest["arrays"].items():
+        array = np.load(os.path.join(path, entry["file"]), mmap_mode="r", allow_pickle=False)
+        if str(array.dtype) != entry["dtype"] or list(array.shape) != entry["shape"]:
+            raise ArtifactError(f"Array '{name}' in {path} doesn't match its manifest entry")
+        arrays[name] = array
+    model = compiled_model.CompiledModel(manifest["model"], arrays)
+    model.manifest = manifest
+    return model
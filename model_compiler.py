@@ -0,0 +1,298 @@
+import argparse
+import json
+
+import numpy as np
+
+import compiled_model
+from compiled_model import MISSING_NAN, MISSING_NONE, MISSING_ZERO
+
+# === Export trained ensembles to compiled_model node tables ===
+# Walks a fitted scikit-learn / XGBoost / LightGBM binary classifier (including the
+# Stacking/Voting hybrids in models/) and flattens every tree into the arrays
+# compiled_model evaluates. Needs the ML libraries at export time only.
+#
+#   python model_compiler.py            # every shipped model -> models/<stem>.artifact/
+#   python model_compiler.py oa --rows 5000
+
+
+def _tree_arrays(trees, prefix, arrays):
+    # trees: list of dicts of per-node arrays (node ids local to the tree, leaves have left == -1)
+    columns = {key: [] for key in ("feature", "threshold", "left", "right", "default_left", "missing", "value")}
+    roots, offset, max_depth = [], 0, 0
+    for tree in trees:
+        n = len(tree["left"])
+        ids = np.arange(n) + offset
+        leaf = tree["left"] < 0
+        columns["feature"].append(np.where(leaf, 0, tree["feature"]))
+        columns["threshold"].append(np.where(leaf, 0.0, tree["threshold"]))
+        columns["left"].append(np.where(leaf, ids, tree["left"] + offset))
+        columns["right"].append(np.where(leaf, ids, tree["right"] + offset))
+        columns["default_left"].append(tree["default_left"])
+        columns["missing"].append(tree["missing"])
+        columns["value"].append(np.where(leaf, tree["value"], 0.0))
+        roots.append(offset)
+        max_depth = max(max_depth, _depth(tree["left"], tree["right"]))
+        offset += n
+
+    dtypes = {"feature": np.int32, "threshold": np.float64, "left": np.int32, "right": np.int32,
+              "default_left": np.bool_, "missing": np.int8, "value": np.float64}
+    for key, parts in columns.items():
+        arrays[prefix + key] = np.concatenate(parts).astype(dtypes[key])
+    arrays[prefix + "roots"] = np.asarray(roots, dtype=np.int32)
+    return max_depth
+
+
+def _depth(left, right):
+    depth, level = 0, [0]
+    while True:
+        level = [child for node in level if left[node] >= 0 for child in (left[node], right[node])]
+        if not level:
+            return depth
+        depth += 1
+
+
+# --- scikit-learn ---
+def _sklearn_tree(estimator):
+    tree = estimator.tree_
+    if tree.n_outputs != 1 or tree.value.shape[2] != 2:
+        raise ValueError("Only single-output binary trees can be compiled")
+    fractions = tree.value[:, 0, :]
+    fractions = fractions / fractions.sum(axis=1, keepdims=True)
+    missing_go_to_left = getattr(tree, "missing_go_to_left", None)
+    return {
+        "feature": tree.feature,
+        "threshold": tree.threshold,
+        "left": tree.children_left,
+        "right": tree.children_right,
+        "default_left": (np.asarray(missing_go_to_left, dtype=bool) if missing_go_to_left is not None
+                         else np.zeros(tree.node_count, dtype=bool)),
+        "missing": np.full(tree.node_count, MISSING_NAN),
+        "value": fractions[:, 1],
+    }
+
+
+def _export_forest(model, prefix, arrays):
+    trees = [_sklearn_tree(tree) for tree in model.estimators_]
+    max_depth = _tree_arrays(trees, prefix, arrays)
+    return {"kind": "forest", "arrays": prefix, "max_depth": max_depth, "op": "<=", "x_dtype": "float32"}
+
+
+def _export_linear(model, prefix, arrays):
+    coef = np.asarray(model.coef_, dtype=np.float64)
+    if coef.shape[0] != 1:
+        raise ValueError("Only binary logistic regression can be compiled")
+    arrays[prefix + "coef"] = coef[0]
+    arrays[prefix + "intercept"] = np.asarray(model.intercept_, dtype=np.float64)[:1]
+    return {"kind": "linear", "arrays": prefix}
+
+
+# --- XGBoost ---
+def _xgb_base_score(learner):
+    raw = learner["learner_model_param"]["base_score"]
+    return float(raw.strip("[]"))
+
+
+def _export_xgboost(model, prefix, arrays):
+    missing = getattr(model, "missing", np.nan)
+    if missing is not None and not np.isnan(missing):
+        raise ValueError(f"Only XGBoost models with missing=nan can be compiled (got {missing})")
+    booster = model.get_booster()
+    learner = json.loads(booster.save_raw("json"))["learner"]
+    objective = learner["objective"]["name"]
+    if objective != "binary:logistic":
+        raise ValueError(f"Unsupported XGBoost objective '{objective}'")
+
+    trees = learner["gradient_booster"]["model"]["trees"]
+    best_iteration = getattr(model, "best_iteration", None)
+    if best_iteration is not None:
+        trees = trees[:best_iteration + 1]  # predict_proba stops at the best iteration too
+    tables = []
+    for tree in trees:
+        if any(tree["split_type"]):
+            raise ValueError("Categorical XGBoost splits can't be compiled")
+        left = np.asarray(tree["left_children"])
+        conditions = np.asarray(tree["split_conditions"], dtype=np.float32)
+        tables.append({
+            "feature": np.asarray(tree["split_indices"]),
+            "threshold": conditions,  # float32 in XGBoost; exact in float64
+            "left": left,
+            "right": np.asarray(tree["right_children"]),
+            "default_left": np.asarray(tree["default_left"], dtype=bool),
+            "missing": np.full(len(left), MISSING_NAN),
+            "value": conditions,  # leaves keep their weight in split_conditions
+        })
+    max_depth = _tree_arrays(tables, prefix, arrays)
+    base_score = _xgb_base_score(learner)
+    return {
+        "kind": "gbdt", "arrays": prefix, "max_depth": max_depth, "op": "<", "x_dtype": "float32",
+        "base_margin": float(np.log(base_score / (1 - base_score))),
+    }
+
+
+# --- LightGBM ---
+_LGBM_MISSING = {"None": MISSING_NONE, "Zero": MISSING_ZERO, "NaN": MISSING_NAN}
+
+
+def _lgbm_tree(structure):
+    nodes = []
+
+    def visit(node):
+        index = len(nodes)
+        nodes.append(None)
+        if "leaf_value" in node:
+            nodes[index] = (-1, -1, 0, 0.0, False, MISSING_NAN, node["leaf_value"])
+            return index
+        if node["decision_type"] != "<=":
+            raise ValueError("Categorical LightGBM splits can't be compiled")
+        left = visit(node["left_child"])
+        right = visit(node["right_child"])
+        nodes[index] = (left, right, node["split_feature"], node["threshold"], node["default_left"],
+                        _LGBM_MISSING[node["missing_type"]], 0.0)
+        return index
+
+    visit(structure)
+    left, right, feature, threshold, default_left, missing, value = map(np.asarray, zip(*nodes))
+    return {"feature": feature, "threshold": threshold, "left": left, "right": right,
+            "default_left": default_left.astype(bool), "missing": missing, "value": value}
+
+
+def _export_lightgbm(model, prefix, arrays):
+    booster = model.booster_
+    dump = booster.dump_model(num_iteration=booster.best_iteration or None)
+    objective = dump.get("objective", "")
+    if not objective.startswith("binary"):
+        raise ValueError(f"Unsupported LightGBM objective '{objective}'")
+    if "sigmoid:1" not in objective:
+        raise ValueError("Only LightGBM binary models with sigmoid:1 can be compiled")
+    max_depth = _tree_arrays([_lgbm_tree(t["tree_structure"]) for t in dump["tree_info"]], prefix, arrays)
+    return {"kind": "gbdt", "arrays": prefix, "max_depth": max_depth, "op": "<=", "x_dtype": "float64",
+            "base_margin": 0.0}
+
+
+# --- Ensembles ---
+def _export_stacking(model, prefix, arrays):
+    if any(method != "predict_proba" for method in model.stack_method_):
+        raise ValueError("Only stack_method='predict_proba' stacking can be compiled")
+    return {
+        "kind": "stacking",
+        "members": [_export(m, f"{prefix}{i}.", arrays) for i, m in enumerate(model.estimators_)],
+        "final": _export(model.final_estimator_, f"{prefix}final.", arrays),
+        "passthrough": bool(model.passthrough),
+    }
+
+
+def _export_voting(model, prefix, arrays):
+    if model.voting != "soft":
+        raise ValueError("Only soft voting can be compiled")
+    return {
+        "kind": "voting",
+        "members": [_export(m, f"{prefix}{i}.", arrays) for i, m in enumerate(model.estimators_)],
+        "weights": [float(w) for w in model.weights] if model.weights is not None else None,
+    }
+
+
+# Matched on class name so exporting doesn't import libraries the model doesn't use
+_EXPORTERS = {
+    "RandomForestClassifier": _export_forest,
+    "ExtraTreesClassifier": _export_forest,
+    "LogisticRegression": _export_linear,
+    "XGBClassifier": _export_xgboost,
+    "LGBMClassifier": _export_lightgbm,
+    "StackingClassifier": _export_stacking,
+    "VotingClassifier": _export_voting,
+}
+
+
+def _export(model, prefix, arrays):
+    exporter = _EXPORTERS.get(type(model).__name__)
+    if exporter is None:
+        raise ValueError(f"Can't compile {type(model).__name__} (supported: {', '.join(_EXPORTERS)})")
+    return exporter(model, prefix, arrays)
+
+
+def compile_model(model):
+    """CompiledModel equivalent to a fitted binary classifier."""
+    if len(model.classes_) != 2:
+        raise ValueError("Only binary classifiers can be compiled")
+    feature_names = getattr(model, "feature_names_in_", None)
+    if feature_names is None:
+        feature_names = [f"x{i}" for i in range(model.n_features_in_)]
+    arrays = {}
+    spec = {
+        "format": compiled_model.FORMAT,
+        "format_version": compiled_model.FORMAT_VERSION,
+        "source": type(model).__name__,
+        "feature_names": [str(name) for name in feature_names],
+        "classes": np.asarray(model.classes_).tolist(),
+        "root": _export(model, "m.", arrays),
+    }
+    return compiled_model.CompiledModel(spec, arrays)
+
+
+def verify(model, compiled, X, atol=1e-6):
+    """Largest |p_original - p_compiled| on X; raises if over atol or any label differs."""
+    expected = model.predict_proba(X)[:, 1]
+    actual = compiled.predict_proba(X)[:, 1]
+    difference = float(np.max(np.abs(expected - actual))) if len(X) else 0.0
+    if difference > atol:
+        raise AssertionError(f"Compiled model differs by {difference:.3g} (> {atol:g})")
+    mismatched = int(np.sum((expected > 0.5) != (actual > 0.5)))
+    if mismatched:
+        raise AssertionError(f"Compiled model changes {mismatched} label(s)")
+    return difference
+
+
+def sample_inputs(feature_names, rows, seed=0):
+    # Random rows: most columns 0/1 (one-hot/binary answers), the rest a wide numeric range
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    X = rng.integers(0, 2, (rows, len(feature_names))).astype(float)
+    numeric = rng.random(len(feature_names)) < 0.3
+    X[:, numeric] = np.round(rng.uniform(-5, 250, (rows, int(numeric.sum()))), 2)
+    return pd.DataFrame(X, columns=list(feature_names))
+
+
+def _artifact_metadata(name):
+    # Encoder, threshold and calibration version recorded in the artifact manifest
+    import calibration
+    import client_scoring
+    import partner_scoring
+    import scoring
+
+    encoders = {"fracture": client_scoring.encoder_spec, "oa": partner_scoring.encoder_spec}
+    return {
+        "encoder": encoders[name]() if name in encoders else None,
+        "threshold": scoring.threshold(name),
+        "calibration_version": calibration.version(name) if name in calibration.CALIBRATIONS else None,
+    }
+
+
+def main():
+    import model_artifact
+    import model_registry
+
+    parser = argparse.ArgumentParser(description="Compile hybrid tree models into memory-mappable artifacts.")
+    parser.add_argument("names", nargs="*", help="registry model names (default: every shipped model)")
+    parser.add_argument("--rows", type=int, default=2000, help="random rows to verify equivalence on")
+    parser.add_argument("--atol", type=float, default=1e-6)
+    args = parser.parse_args()
+
+    registry = model_registry.ModelRegistry(model_registry.MODEL_FILES, model_format="pickle")
+    for name in args.names or registry.shipped():
+        model = registry.get(name)
+        compiled = compile_model(model)
+        difference = verify(model, compiled, sample_inputs(compiled.feature_names_in_, args.rows), args.atol)
+        source = registry.path(name)
+        path = model_artifact.artifact_path(source)
+        manifest = model_artifact.write(compiled, path, source=source, **_artifact_metadata(name))
+
+        # Read it back the way workers will and check it again
+        loaded = model_artifact.load(path, verify_checksums=True)
+        verify(model, loaded, sample_inputs(compiled.feature_names_in_, args.rows, seed=1), args.atol)
+        print(f"{name}: {path} ({len(manifest['arrays'])} arrays, checksum {manifest['checksum'][:12]}, "
+              f"max |dp| {difference:.2e})")
+
+
+if __name__ == "__main__":
+    main()
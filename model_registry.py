@@ -0,0 +1,223 @@
+import os
+import threading
+import time
+import warnings
+
+import joblib
+
+# === Lazy model registry ===
+# Nothing is unpickled at import time: a model is loaded the first time it is asked
+# for (or when warm() is called) and then shared by every page and session in the
+# process. Load time and memory are recorded per model, and a model whose file in
+# models/ changes is reloaded on its next use.
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
+
+MODEL_FILES = {
+    # Fragility fracture model used by prediction_client / hold — not shipped in models/ yet
+    "fracture": "osteoporosis_risk_model.pkl",
+    # Osteoarthritis model used by prediction_partner
+    "oa": "hybrid_prosthetic_oa_model.pkl",
+    # Mabel's hybrid osteo model (trained on the partner questionnaire columns)
+    "osteo": "Mabels_partner_hybrid_osteo_model.pkl",
+}
+
+# What warm() preloads by default: the models the pages, services and pipelines score
+# with. "osteo" stays registered (get_model("osteo") still works) but nothing scores
+# with it, so no process unpickles it — or builds its chart and explainer — up front
+WARM_MODELS = ("fracture", "oa")
+
+# "pickle" loads the joblib files; "compiled" prefers the <stem>.artifact/ directory
+# next to each pickle (model_compiler -> model_artifact: memory-mapped NumPy node
+# tables, no unpickling, no scikit-learn/XGBoost import) and falls back to the pickle
+# when none was exported. The Streamlit pages keep "pickle" so SHAP explanations
+# have the original estimators.
+MODEL_FORMAT = os.environ.get("MODEL_FORMAT", "pickle")
+
+# How often (seconds) get() re-stats a loaded model's file to pick up a new version
+VERSION_CHECK_INTERVAL = 1.0
+
+
+def _rss_bytes():
+    # Resident set size on Linux; None elsewhere
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _disk_bytes(path):
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+
+class ModelRegistry:
+    def __init__(self, files, models_dir=MODELS_DIR, model_format=MODEL_FORMAT, warm_models=None):
+        if model_format not in ("pickle", "compiled"):
+            raise ValueError(f"Unknown model format '{model_format}' (expected 'pickle' or 'compiled')")
+        self._files = dict(files)
+        self._warm_models = warm_models  # None: every registered model
+        self._models_dir = models_dir
+        self.model_format = model_format
+        self._models = {}
+        self._stats = {}
+        self._versions = {}
+        self._checked = {}
+        self._load_hooks = []
+        self._load_lock = threading.Lock()
+
+    def register(self, name, filename):
+        # Add or repoint an entry (absolute paths are used as-is); takes effect on next get()
+        with self._load_lock:
+            self._files[name] = filename
+            self._models.pop(name, None)
+            self._versions.pop(name, None)
+
+    def names(self):
+        return list(self._files)
+
+    def path(self, name):
+        if name not in self._files:
+            raise KeyError(f"Unknown model '{name}' (known: {', '.join(self._files)})")
+        return os.path.join(self._models_dir, self._files[name])
+
+    def source(self, name):
+        # The file get() actually loads for this registry's format
+        path = self.path(name)
+        if self.model_format == "compiled":
+            artifact = os.path.splitext(path)[0] + ".artifact"
+            if os.path.exists(os.path.join(artifact, "manifest.json")):
+                return artifact
+        return path
+
+    def shipped(self):
+        return [name for name in self._files if os.path.exists(self.source(name))]
+
+    def is_loaded(self, name):
+        return name in self._models
+
+    def version(self, name):
+        # Cheap file fingerprint: changes whenever the pickle is replaced
+        source = self.source(name)
+        if os.path.isdir(source):
+            source = os.path.join(source, "manifest.json")  # written last on every export
+        st = os.stat(source)
+        return f"{st.st_mtime_ns:x}-{st.st_size:x}"
+
+    def loaded_version(self, name):
+        return self._versions.get(name)
+
+    def _changed(self, name):
+        now = time.monotonic()
+        if now - self._checked.get(name, 0.0) < VERSION_CHECK_INTERVAL:
+            return False
+        self._checked[name] = now
+        try:
+            return self.version(name) != self._versions.get(name)
+        except FileNotFoundError:
+            return False  # keep serving the copy already in memory
+
+    def on_load(self, hook):
+        # hook(name, model) runs after every (re)load, e.g. to precompute per-model caches
+        self._load_hooks.append(hook)
+
+    def get(self, name):
+        model = self._models.get(name)
+        if model is not None and not self._changed(name):
+            return model
+        # Loads are serialized so the memory deltas of concurrent loads don't mix
+        loaded = False
+        with self._load_lock:
+            model = self._models.get(name)
+            if model is None or self.version(name) != self._versions.get(name):
+                model = self._models[name] = self._load(name)
+                loaded = True
+        if loaded:
+            for hook in self._load_hooks:
+                try:
+                    hook(name, model)
+                except Exception as e:
+                    warnings.warn(f"Load hook {hook.__name__} failed for model '{name}': {e}")
+        return model
+
+    def _load(self, name):
+        path = self.source(name)
+        if not os.path.exists(path):
+            self._stats[name] = {"path": path, "loaded": False, "error": "file not found"}
+            raise FileNotFoundError(f"Model '{name}' not found at {path}")
+
+        version = self.version(name)
+        # RSS delta rather than tracemalloc: tracing slows unpickling several-fold and
+        # misses the native XGBoost/LightGBM buffers anyway
+        before_rss = _rss_bytes()
+        start = time.perf_counter()
+        if os.path.isdir(path):
+            import model_artifact
+            model = model_artifact.load(path)
+        else:
+            model = joblib.load(path)
+        elapsed = time.perf_counter() - start
+        after_rss = _rss_bytes()
+
+        self._stats[name] = {
+            "path": path,
+            "loaded": True,
+            "format": "compiled" if os.path.isdir(path) else "pickle",
+            "file_mb": _disk_bytes(path) / 1e6,
+            "load_seconds": elapsed,
+            "memory_mb": (after_rss - before_rss) / 1e6 if before_rss is not None else None,
+            "version": version,
+        }
+        self._versions[name] = version
+        self._checked[name] = time.monotonic()
+        return model
+
+    def warm(self, names=None, background=True):
+        # Pre-load models (the shipped ones of the warm set by default); missing files are recorded, not raised
+        if names is None:
+            names = [name for name in self.shipped() if self._warm_models is None or name in self._warm_models]
+        names = list(names)
+
+        def _warm():
+            for name in names:
+                try:
+                    self.get(name)
+                except FileNotFoundError:
+                    pass
+
+        if not background:
+            _warm()
+            return None
+        thread = threading.Thread(target=_warm, name="model-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def stats(self):
+        report = {}
+        for name in self._files:
+            report[name] = self._stats.get(name, {"path": self.path(name), "loaded": False})
+        return report
+
+
+registry = ModelRegistry(MODEL_FILES, warm_models=WARM_MODELS)
+
+get_model = registry.get
+warm = registry.warm
+stats = registry.stats
+loaded_version = registry.loaded_version
+
+
+if __name__ == "__main__":
+    registry.warm(background=False)
+    for name, info in registry.stats().items():
+        if info.get("loaded"):
+            memory = info["memory_mb"]
+            print(
+                f"✅ {name:<9} {info['file_mb']:.2f} MB file | load {info['load_seconds'] * 1000:.1f} ms | "
+                + (f"memory +{memory:.1f} MB" if memory is not None else "memory n/a")
+            )
+        else:
+            reason = info.get('error', 'not preloaded' if name in registry.shipped() else 'not shipped')
+            print(f"⚠ {name:<9} not loaded ({reason}): {info['path']}")
@@ -0,0 +1,139 @@
+import argparse
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import batch_client
+import client_scoring
+import model_registry
+import partner_scoring
+
+# === Parallel batch scoring across worker processes ===
+# For population-level re-screening files that one core can't get through overnight:
+#
+#   reader (main) -> chunk -> pool of worker processes -> results, in input order -> writer (main)
+#
+# Each worker loads the model once in its initializer — from the memory-mapped .artifact
+# directory when there is one, so every worker maps the same page-cache pages instead of
+# unpickling its own copy — and then only ever receives chunks. At most MAX_PENDING
+# chunks per worker are in flight: the reader blocks until the oldest chunk comes back,
+# which keeps memory bounded and the output in roster order.
+#
+# Native thread pools (OpenMP in XGBoost/LightGBM, BLAS) are capped per worker with
+# threadpoolctl so workers x threads doesn't exceed the cores.
+#
+#   python parallel_scoring.py fracture roster.csv scores.parquet --workers 16
+#   python parallel_scoring.py oa partners.parquet oa_scores.csv --model models/hybrid_prosthetic_oa_model.pkl
+
+DEFAULT_CHUNKSIZE = 20_000
+MAX_PENDING = 2  # chunks in flight per worker
+START_METHOD = "spawn"  # fresh interpreters: no inherited locks/threads from the parent
+
+_worker = {}
+
+
+def _fracture_scorer(model):
+    return lambda chunk: client_scoring.score_valid(model, chunk)
+
+
+def _oa_scorer(model):
+    encoder = partner_scoring.PartnerEncoder(model.feature_names_in_)
+    return lambda chunk: partner_scoring.score_valid(model, encoder, chunk)
+
+
+# name -> factory(model) -> score(chunk) -> (results for the valid rows, error report)
+SCORERS = {
+    "fracture": _fracture_scorer,
+    "oa": _oa_scorer,
+}
+
+
+def model_source(name, path=None):
+    # Prefer the memory-mappable artifact: shared between workers and fast to open
+    if path is not None:
+        return os.path.abspath(path)
+    return model_registry.ModelRegistry(model_registry.MODEL_FILES, model_format="compiled").source(name)
+
+
+def default_threads(workers):
+    return max(1, (os.cpu_count() or 1) // workers)
+
+
+def _init_worker(name, source, threads):
+    from threadpoolctl import threadpool_limits
+
+    registry = model_registry.ModelRegistry({name: source}, model_format="pickle")
+    model = registry.get(name)
+    _worker.update(model=model, score=SCORERS[name](model), stats=registry.stats()[name])
+    # After the load, so the model's native libraries are already there to be limited
+    _worker["limits"] = threadpool_limits(limits=threads)
+
+
+def _score_chunk(chunk):
+    return _worker["score"](chunk)
+
+
+def score_parallel(name, source, chunks, workers, threads=None, quarantine=None, max_pending=MAX_PENDING, start=0):
+    """Scored chunks in input order (one per input chunk, rows numbered from `start`);
+    bad rows go to `quarantine` (list) or raise ValueError without one."""
+    if name not in SCORERS:
+        raise KeyError(f"No parallel scorer for model '{name}' (known: {', '.join(SCORERS)})")
+    threads = threads or default_threads(workers)
+    pool = ProcessPoolExecutor(
+        workers, mp_context=multiprocessing.get_context(START_METHOD),
+        initializer=_init_worker, initargs=(name, source, threads),
+    )
+    pending = deque()  # (chunk, future), oldest first
+    try:
+        for chunk in batch_client.number_rows(chunks, start):
+            pending.append((chunk, pool.submit(_score_chunk, chunk)))
+            if len(pending) >= workers * max_pending:
+                chunk, future = pending.popleft()
+                yield batch_client.merge_results(chunk, *future.result(), quarantine)
+        while pending:
+            chunk, future = pending.popleft()
+            yield batch_client.merge_results(chunk, *future.result(), quarantine)
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def score_file(name, source, input_path, output_path, workers, chunksize=DEFAULT_CHUNKSIZE, threads=None,
+               strict=False):
+    """Score a roster file in parallel; returns (rows scored, rows quarantined)."""
+    quarantine = None if strict else []
+    chunks = batch_client.read_chunks(input_path, chunksize)
+    rows = batch_client.write_chunks(score_parallel(name, source, chunks, workers, threads, quarantine), output_path)
+    if quarantine:
+        batch_client.write_chunks(quarantine, batch_client.quarantine_path(output_path))
+    return rows, sum(len(q) for q in quarantine or [])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a large roster across a pool of worker processes.")
+    parser.add_argument("name", choices=list(SCORERS), help="registry model to score with")
+    parser.add_argument("input", help="CSV or Parquet roster (one patient per row)")
+    parser.add_argument("output", help="CSV or Parquet file to write the scores to")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--threads", type=int, help="native threads per worker (default: cores / workers)")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="rows per chunk")
+    parser.add_argument("--model", help="model pickle or .artifact directory (default: the registry's, "
+                                        "preferring its .artifact)")
+    parser.add_argument("--strict", action="store_true",
+                        help="fail on the first invalid row instead of quarantining it")
+    args = parser.parse_args(argv)
+
+    source = model_source(args.name, args.model)
+    start = time.perf_counter()
+    rows, rejected = score_file(args.name, source, args.input, args.output, args.workers, args.chunksize,
+                                args.threads, args.strict)
+    elapsed = time.perf_counter() - start
+    print(f"✅ Scored {rows} rows -> {args.output} in {elapsed:.1f}s "
+          f"({rows / elapsed:,.0f} rows/s, {args.workers} workers, model {source})")
+    if rejected:
+        print(f"⚠ Quarantined {rejected} invalid rows -> {batch_client.quarantine_path(args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+import functools
+
+import pandas as pd
+
+import calibration
+import feature_schema
+import metrics
+import scoring
+from feature_schema import SchemaEncoder
+
+# === Osteoarthritis model: precompiled input encoder ===
+# Replaces the per-click LabelEncoder + pd.get_dummies + column-alignment loop in
+# prediction_partner.show(). PARTNER_SCHEMA is compiled once against the model's
+# feature_names_in_, after which answers are written straight into a NumPy matrix.
+
+BINARY_MAP = {"No": 0, "Yes": 1}  # same codes LabelEncoder().fit(['No', 'Yes']) gives
+
+YES_NO = ["Yes", "No"]
+DURATIONS = ["<1 year", "1-2 years", "2-5 years", "5+ years"]
+
+
+def _yes_no(name, label):
+    return {"name": name, "type": "binary", "label": label, "choices": YES_NO, "codes": BINARY_MAP}
+
+
+def _one_to_five(name, label, default):
+    return {"name": name, "type": "integer", "label": label, "min": 1, "max": 5, "default": default}
+
+
+# Form order. One-hot answers become "<name>_<answer>" columns (pd.get_dummies naming);
+# the model's own column suffixes are accepted answers too.
+PARTNER_SCHEMA = {
+    "name": "oa",
+    "version": 1,
+    "fields": [
+        {"name": 'age', "type": "onehot", "label": "📅 Age Group",
+         "choices": ['Under 18', '18-25', '26-35', '36-45', '46-60', '60+']},
+        {"name": 'sex', "type": "onehot", "label": "👤 Sex", "choices": ["Male", "Female"]},
+        {"name": 'weight (kg)', "type": "number", "label": "⚖️ Weight (kg)", "min": 30.0, "max": 200.0, "default": 75.0,
+         "widget": "number"},
+        {"name": 'height (cm)', "type": "number", "label": "📏 Height (cm)", "min": 100.0, "max": 220.0, "default": 170.0,
+         "widget": "number"},
+        # 0 means "calculate from weight and height" (fill_bmi)
+        {"name": 'body mass index (bmi)', "type": "number", "label": "💪 BMI (enter 0 to auto-calculate)", "min": 0.0,
+         "default": 0.0, "widget": "number", "widget_args": {"max_value": 80.0}},
+        _yes_no('have you had any previous joint injuries or surgeries', "🦴 Previous joint injuries or surgeries?"),
+        _yes_no('do you have a family history of osteoarthritis', "👪 Family history of osteoarthritis?"),
+        _yes_no('do you have any other health conditions (e.g, diabetes, rheumatoid arthritis)', "🏥 Other health conditions?"),
+        _yes_no('are you currently taking any medications', "💊 Currently taking any medications?"),
+        {"name": 'what type of amputation do you have?', "type": "onehot", "label": "🦿 Type of amputation",
+         "choices": ["Below Knee", "Above Knee", "Foot"]},
+        {"name": 'what level of amputation do you have?', "type": "onehot", "label": "📉 Level of amputation",
+         "choices": ["Trans-tibial", "Trans-femoral", "Partial", "Complete"]},
+        {"name": 'what caused the amputation?', "type": "onehot", "label": "💥 Cause of amputation",
+         "choices": ["Accident", "Infection", "Disease", "Trauma"]},
+        {"name": 'for how long have you been with amputation?', "type": "onehot", "label": "📆 How long since amputation",
+         "choices": DURATIONS},
+        {"name": 'what type of lower limb prosthesis are you using?', "type": "onehot", "label": "🦿 Type of prosthesis",
+         "choices": ["Mechanical", "Microprocessor", "Passive"]},
+        {"name": 'how long have you been using a lower limb prosthesis?', "type": "onehot",
+         "label": "📆 How long using prosthesis", "choices": DURATIONS},
+        {"name": 'how often do you use your prosthesis?', "type": "onehot", "label": "⏱️ Frequency of use",
+         "choices": ["Rarely", "Sometimes", "Often", "Daily", "Always"]},
+        _one_to_five('how would you rate your level of mobility and independence? (scale 1-5, where 1 is very limited and 5 is very independent)',
+                     "🚶 Mobility level (1 = low, 5 = high)", 3),
+        _yes_no('does pain impact your daily activities?', "⚠️ Does pain impact daily activities?"),
+        _yes_no('do you experience any other symptoms? (e.g, stiffness, swelling)', "🤕 Other symptoms (stiffness, swelling)?"),
+        _one_to_five('how satisfied are you with the fit and comfort of your prosthesis on a scale of 1-5( where 1 is very dissatisfied and 5 is very satisfied)',
+                     "😊 Prosthesis comfort (1 = bad, 5 = great)", 4),
+        _one_to_five('how does your prosthesis impact your daily life and activities on a scale of 1-5 (where 1 is very negatively and 5 is very positively)',
+                     "🌟 Impact on daily life (1 = bad, 5 = good)", 3),
+        _one_to_five('how satisfied are you with your current level of mobility and independence on a scale of 1-5 (where 1 is very dissatisfied and 5 is very satisfied)',
+                     "👍 Satisfaction with mobility (1 = low, 5 = high)", 4),
+        _yes_no('do you engage in regular exercise?', "🏃 Exercise regularly?"),
+        _yes_no('do you smoke?', "🚬 Do you smoke?"),
+        _one_to_five('how would you rate your diet and nutrition habit on a scale of 1-5? (where 1 is poor and 5 is excellent)',
+                     "🥗 Diet rating (1 = poor, 5 = excellent)", 3),
+    ],
+}
+
+
+class PartnerEncoder(SchemaEncoder):
+    """Maps raw partner answers into the model's column order, one row or many."""
+
+    def __init__(self, feature_names):
+        super().__init__(PARTNER_SCHEMA, feature_names)
+
+
+@functools.lru_cache(maxsize=4)
+def _encoder(feature_names):
+    return PartnerEncoder(list(feature_names))
+
+
+def encoder_for(model):
+    # Compiled once per column layout: a reloaded model with other columns gets its own
+    return _encoder(tuple(map(str, model.feature_names_in_)))
+
+
+def encoder_spec():
+    # How answers become model inputs, recorded in the model artifact manifest
+    return {"kind": "partner_scoring", "schema": feature_schema.to_dict(PARTNER_SCHEMA)}
+
+
+def fill_bmi(answers):
+    # Form convention: BMI of 0 (or missing) means "calculate from weight and height"
+    bmi = answers.get('body mass index (bmi)')
+    if isinstance(answers, dict):
+        if not bmi:
+            height_m = answers['height (cm)'] / 100
+            answers = {**answers, 'body mass index (bmi)': round(answers['weight (kg)'] / height_m ** 2, 2)}
+        return answers
+    # Coerced, so a malformed roster row is reported by validation instead of raising here
+    weight = pd.to_numeric(answers['weight (kg)'], errors="coerce")
+    height_m = pd.to_numeric(answers['height (cm)'], errors="coerce") / 100
+    answers = answers.copy()
+    calculated = (weight / height_m ** 2).round(2)
+    if bmi is None:
+        answers['body mass index (bmi)'] = calculated
+    else:
+        # Rosters read as text (scoring_pipeline) hold "0"/"0.0"; other text is left for validation
+        calculate = bmi.isna() | (pd.to_numeric(bmi, errors="coerce") == 0)
+        answers['body mass index (bmi)'] = bmi.where(~calculate, calculated)
+    return answers
+
+
+# === Adaptive confidence adjustment, derived metrics & bands (calibration table) ===
+def adjust_confidence(raw_probability):
+    return calibration.adjust("oa", raw_probability)
+
+
+def assess(raw_probability, display=True):
+    return calibration.apply("oa", raw_probability, display=display)
+
+
+def _results(model, features, index, threshold):
+    # One predict_proba call for the whole frame; the label is thresholded from the same probabilities
+    threshold = scoring.threshold("oa") if threshold is None else threshold
+    with metrics.timed("oa", "model"):
+        raw_probability, prediction = scoring.predict(model, features, threshold)
+
+    results = pd.DataFrame(assess(raw_probability, display=False), index=index)
+    results.insert(0, 'raw_probability', raw_probability)
+    results.insert(0, 'prediction', prediction)
+    results['calibration_version'] = calibration.version("oa")
+    return results
+
+
+def score_frame(model, encoder, answers, threshold=None):
+    # Strict: any invalid answer raises ValueError for the whole frame
+    features = encoder.frame(encoder.encode(fill_bmi(answers)))
+    return _results(model, features, answers.index, threshold)
+
+
+def score_valid(model, encoder, answers, threshold=None):
+    """Score the rows that pass validation: (results for those rows, error report for the rest)."""
+    matrix, valid, errors = encoder.validate(fill_bmi(answers))
+    index = answers.index[valid]
+    return _results(model, encoder.frame(matrix[valid], index=index), index, threshold), errors
@@ -1,14 +1,28 @@
 import streamlit as st
-import prediction_client
-import prediction_partner
+import metrics
+import model_registry
 
 def show():
+    # Start unpickling the shipped models while the user is still choosing
+    if not st.session_state.get("models_warming"):
+        model_registry.warm()
+        st.session_state.models_warming = True
+
     st.title("🧠 Choose Prediction Type")
     st.markdown("Select the type of prediction you want to perform:")
 
-    option = st.selectbox("Choose Model", ["-- Select --", "Mabel's Prediction", "Babatunda's Prediction"])
+    option = st.selectbox("Choose Model", ["-- Select --", "Mabel's Prediction", "Babatunda's Prediction", "Combined Assessment"])
 
+    # Page modules (and the libraries they pull in) are imported only once chosen
     if option == "Mabel's Prediction":
-        prediction_client.show()
+        import prediction_client
+        with metrics.timed("fracture", "render"):
+            prediction_client.show()
     elif option == "Babatunda's Prediction":
-        prediction_partner.show()
+        import prediction_partner
+        with metrics.timed("oa", "render"):
+            prediction_partner.show()
+    elif option == "Combined Assessment":
+        import prediction_combined
+        with metrics.timed("combined", "render"):
+            prediction_combined.show()
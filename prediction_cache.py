@@ -0,0 +1,105 @@
+import hashlib
+import os
+import threading
+
+import numpy as np
+from cachetools import TTLCache
+
+import micro_batcher
+import model_registry
+
+# === Shared prediction cache ===
+# Process-wide LRU + TTL cache of predict_proba rows, keyed by a hash of the encoded
+# feature vector and the model file version. Identical re-submissions (from any
+# session) skip the model entirely; replacing a file in models/ changes the version,
+# so stale entries are never served and are dropped on the next lookup.
+
+MAX_ENTRIES = int(os.environ.get("PREDICTION_CACHE_SIZE", 10_000))
+TTL_SECONDS = float(os.environ.get("PREDICTION_CACHE_TTL", 3600))
+
+
+def feature_key(row):
+    return hashlib.blake2b(np.ascontiguousarray(row, dtype=np.float64).tobytes(), digest_size=16).digest()
+
+
+class PredictionCache:
+    def __init__(self, maxsize=MAX_ENTRIES, ttl=TTL_SECONDS):
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._versions = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _drop_stale(self, name, version):
+        # Caller holds the lock
+        if self._versions.get(name) != version:
+            for key in [k for k in self._entries.keys() if k[0] == name]:
+                del self._entries[key]
+            self._versions[name] = version
+
+    def predict_proba(self, name, X):
+        model_registry.get_model(name)  # picks up a changed model file before we key on its version
+        version = model_registry.loaded_version(name)
+        X = np.asarray(X, dtype=float)
+        keys = [(name, version, feature_key(row)) for row in X]
+
+        results = [None] * len(keys)
+        missing = []
+        with self._lock:
+            self._drop_stale(name, version)
+            for i, key in enumerate(keys):
+                proba = self._entries.get(key)
+                if proba is None:
+                    missing.append(i)
+                else:
+                    results[i] = proba
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            scored = micro_batcher.predict_proba(name, X[missing])
+            with self._lock:
+                for i, proba in zip(missing, scored):
+                    self._entries[keys[i]] = results[i] = proba
+        return np.vstack(results)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "max_entries": self._entries.maxsize,
+                "ttl_seconds": self._entries.ttl,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+
+class CachedModel:
+    # Model stand-in (predict_proba + classes_) backed by the shared cache
+    def __init__(self, name, cache):
+        self.name = name
+        self._cache = cache
+
+    @property
+    def classes_(self):
+        return model_registry.get_model(self.name).classes_
+
+    def predict_proba(self, X):
+        return self._cache.predict_proba(self.name, X)
+
+
+cache = PredictionCache()
+
+
+def get_cached_model(name):
+    return CachedModel(name, cache)
+
+
+stats = cache.stats
@@ -1,14 +1,146 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-import joblib
-
-# === Load model ===
-@st.cache_resource
+import batch_client
+import charts
+import client_scoring
+import explanations
+import form_widgets
+import metrics
+import model_registry
+import result_store
+import scoring
+
+# === Load model (lazily, on first use) ===
 def load_model():
-    return joblib.load("models/osteoporosis_risk_model.pkl")
-
-model = load_model()
+    return model_registry.get_model("fracture")
+
+
+def show_contributions(contributions):
+    if contributions is None:
+        st.info("⏳ The per-patient breakdown isn't available right now — try again in a moment.")
+        return
+    top = explanations.top_risk_factors(contributions)
+    if top.empty:
+        st.markdown("No major contributing risk factors detected.")
+        return
+    st.markdown("#### 🔹 Detected Risks:")
+    for feature, value in top.items():
+        st.markdown(f"- {feature} (+{value:.1%})")
+
+
+RISK_LEVEL_HTML = {
+    "High": "🔴 <b style='color:red;'>High</b>",
+    "Medium": "🟠 <b style='color:orange;'>Medium</b>",
+    "Low": "🔵 <b style='color:blue;'>Low</b>",
+}
+
+
+def compute_result(input_df):
+    # Everything the result section shows; run once per distinct submission (result_store)
+    result = scoring.score("fracture", input_df)
+
+    # ----- Adaptive Confidence Adjustment + FRAX-like Calculations -----
+    assessment = client_scoring.assess(result["probability"])
+
+    # ----- Contributing Factors (per-patient SHAP) -----
+    with metrics.timed("fracture", "explain"):
+        contributions = explanations.explain_patient("fracture", input_df)
+
+    return {"input_df": input_df, "assessment": assessment, "contributions": contributions}
+
+
+@st.fragment
+def show_result(result):
+    # Reruns on its own: nothing in the result section reruns the form or the page
+    assessment = result["assessment"]
+    probability = float(assessment['probability'][0])
+    hip_fracture_risk = float(assessment['hip_fracture_risk'][0])
+    major_fracture_risk = float(assessment['major_fracture_risk'][0])
+    relative_risk = float(assessment['relative_risk'][0])
+    diagnosis = assessment['diagnosis'][0]
+    diagnosis_color = assessment['diagnosis_color'][0]
+    risk_level = RISK_LEVEL_HTML[assessment['risk_level'][0]]
+
+    st.markdown("<h2>📋 <b>Result Summary</b></h2>", unsafe_allow_html=True)
+
+    # ----- Smoothed Diagnosis -----
+    st.markdown(
+        f"<h3>🧠 Diagnosis: <span style='color:{diagnosis_color}; font-weight:bold;'>{diagnosis}</span></h3>",
+        unsafe_allow_html=True
+    )
+
+    # ----- Vertical Risk Summary -----
+    st.markdown(f"""
+    <div style='font-size:18px; line-height:1.8;'>
+        📊 <b>Confidence Score:</b> {probability:.2%}<br>
+        🧪 <b>Risk Level:</b> {risk_level}<br>
+        🦴 <b>10-year Hip Fracture Risk:</b> {hip_fracture_risk:.1f}%<br>
+        🩻 <b>10-year Major Fracture Risk:</b> {major_fracture_risk:.1f}%<br>
+        📈 <b>Relative Risk vs Average:</b> {relative_risk:.1f}x
+    </div>
+    """, unsafe_allow_html=True)
+
+    # ----- Risk Gauge (prebuilt per model, only the value and colour change) -----
+    with metrics.timed("fracture", "chart"):
+        charts.show_gauge("fracture", probability*100, assessment['gauge_color'][0])
+
+    # ----- Recommendations -----
+    st.markdown("### 🧭 Personalized Recommendations")
+    if assessment['advice'][0] == "at_risk":
+        st.markdown("""
+        - 🏥 **Consult a specialist** for further testing  
+        - 💊 Consider **bone-strengthening medications**  
+        - 🥗 Follow a **calcium & vitamin D-rich diet**  
+        - 🏃‍♀️ Engage in **weight-bearing and resistance exercises**  
+        - 🧘‍♂️ Practice **fall prevention strategies**  
+        - 🩺 Schedule **regular bone density scans**
+        """)
+    else:
+        st.markdown("""
+        - ✅ Maintain **a healthy weight and lifestyle**  
+        - 🥦 Consume foods rich in **calcium and vitamin D**  
+        - 🚭 Avoid **smoking and alcohol**  
+        - 🏃‍♂️ Stay active with **low-impact exercises**  
+        - 🩺 Get routine **check-ups and scans**
+        """)
+
+    # ----- Contributing Factors (per-patient SHAP) -----
+    st.markdown("### 🧬 Top Contributing Risk Factors")
+    if result["contributions"] is None:
+        # Missed its latency budget last time; the saved result picks it up once it's ready
+        with metrics.timed("fracture", "explain"):
+            result["contributions"] = explanations.explain_patient("fracture", result["input_df"])
+    show_contributions(result["contributions"])
+
+
+@st.fragment
+def show_batch_scoring(model):
+    # Uploading or scoring a roster reruns this section only
+    with st.expander("📂 Batch Scoring (CSV / Parquet roster)"):
+        st.markdown("One patient per row, using the same column names and answers as the form above.")
+        uploaded = st.file_uploader("Upload roster", type=["csv", "parquet"])
+        if uploaded is not None and st.button("⚡ Score Roster"):
+            try:
+                results, rejected = batch_client.score_upload(model, uploaded)
+            except (KeyError, ValueError) as e:
+                st.error(f"⚠ Unable to score roster: {e}")
+            else:
+                st.success(f"✅ Scored {len(results)} patients")
+                st.dataframe(results.head(100))
+                st.download_button(
+                    "⬇️ Download Scores (CSV)",
+                    results.to_csv(index=False),
+                    file_name="fracture_scores.csv",
+                    mime="text/csv",
+                )
+                if len(rejected):
+                    st.warning(f"⚠ {len(rejected)} rows were not scored because of invalid answers")
+                    st.dataframe(rejected[["row", "errors"]].head(100))
+                    st.download_button(
+                        "⬇️ Download Rejected Rows (CSV)",
+                        rejected.to_csv(index=False),
+                        file_name="fracture_rejected.csv",
+                        mime="text/csv",
+                    )
 
 
 def show():
@@ -16,133 +148,24 @@ def show():
     st.title("🦴 Fragility Fracture Prediction")
     st.markdown("Fill in the patient's clinical, demographic, and lifestyle details:")
 
-    # === Collect Inputs ===
-    age = st.slider("Age", 18, 100, 45)
-    gender = st.selectbox("Gender", ["Female", "Male"])
-    education = st.selectbox("Level of Education", ["Primary", "Secondary", "Tertiary"])
-    ethnicity = st.selectbox("Ethnicity", [
-        "Akwa ibom", "Akwaibom", "Benin", "Efik", "Hausa",
-        "Ife", "Igbo", "Minority ethnic group", "Tiv", "Yoruba"
-    ])
-    weight = st.number_input("Weight (kg)", 30.0, 200.0, step=0.5)
-    height = st.number_input("Height (m)", 1.0, 2.5, step=0.01)
-
-    bmi = round(weight / (height ** 2), 2)
-    st.markdown(f"**BMI:** `{bmi}`")
-
-    bone_density = st.slider("Bone Density (T-score)", -4.0, 2.5, -1.0)
-
-    # Binary/Int Inputs
-    bool_map = {"Yes": 1, "No": 0}
-
-    osteoporosis_fam = st.selectbox("Osteoporosis Family History", list(bool_map.keys()))
-    osteoporosis_diag = st.selectbox("Diagnosed with Osteoporosis?", list(bool_map.keys()))
-    osteopenia_fam = st.selectbox("Osteopenia Family History", list(bool_map.keys()))
-    osteopenia_diag = st.selectbox("Diagnosed with Osteopenia?", list(bool_map.keys()))
-
-    # amp_type = st.slider("Type of Amputation (Numeric ID)", 0, 5, 2)
-    amp_type = st.selectbox("Type of Amputation", [
-        "Hip Disariculation", "Transtibial Amputation", "Knee Disarticulation", "Transformoral Amputation"
-    ])
-    # amp_cause = st.slider("Cause of Amputation (Numeric ID)", 0, 5, 1)
-    amp_cause = st.selectbox("Cause of Amputation", [
-        "Trauma", "Vascular Disease", "Tumor/Cancer", "Infection", "Diabetes", "Gengrene", "Peripheral Artarial Disease", "Chronic bone deformity"
-    ])
-    years_amp = st.slider("Years with Amputation", 0, 60, 6)
-    glucocorticoids = st.selectbox("Glucocorticoid Use?", list(bool_map.keys()))
-    # chronic_illness = st.slider("Chronic Illness Count", 0, 5, 2)
-    # chronic_illness = st.selectbox("Chronic Illness Count", [
-    #     "Gangrene", "Disease", "Diabetes", "Arterial", "Tumor", "Cancer"
-    # ])
-    chronic_illness = st.selectbox("Chronic Illness / Cormorbidities?", list(bool_map.keys()))
-    # chronic_detail = st.slider("Chronic Illness Detail ID", 0, 5, 2)
-
-    chronic_detail = st.selectbox("Chronic Illness Detail ID", [
-        "Arthritis", "Rheumatoid Arthritis", "Osteoarthritis", "Hypertension", "Diabetes", "Peripheral Artarial Disease", "None"
-    ])
-
-    supplements = st.selectbox("Taking Bone Supplements?", list(bool_map.keys()))
-    gait_diff = st.selectbox("Gait Difficulty?", list(bool_map.keys()))
-    gait_change = st.selectbox("Change in Gait?", list(bool_map.keys()))
-    assistive_device = st.selectbox("Using Assistive Device?", list(bool_map.keys()))
-    daily_activities = st.selectbox("Independent in Daily Activities?", list(bool_map.keys()))
-    rom_limit = st.selectbox("Range of Motion Limitations?", list(bool_map.keys()))
-    activity_lim = st.selectbox("Activity Performance Change?", list(bool_map.keys()))
-    pain_change = st.selectbox("Increased Pain Over Time?", list(bool_map.keys()))
-
-    # prosthesis_type = st.slider("Lower Limb Prosthesis Type (Numeric ID) Note: 1=  Knee Disarticulation Prosthesis, 2=  Transtibial Prosthesis, 3 =  Transfermoral (complex) Prosthesis", 0, 3, 2)
-    prosthesis_type = st.selectbox("Lower Limb Prosthesis Type (Numeric ID)", [
-        "Knee Disarticulation Prosthesis", "Transtibial Prosthesis", "Transfermoral (complex) Prosthesis"
-    ])
-    history_falls = st.selectbox("History of Falls?", list(bool_map.keys()))
-    prosthesis_years = st.slider("Years Using Prosthetic Limb", 0, 50, 3)
-    prosthesis_issues = st.selectbox("Complications with Prosthesis (Pain, Discomfort, Loose/Tight fitting)?", list(bool_map.keys()))
-
-    activity_level = st.selectbox("Activity Level with Prosthesis (ID)", [0, 1, 2])
-    regular_exercise = st.selectbox("Engages in Regular Exercise?", list(bool_map.keys()))
-    exercise_minutes = st.slider("Minutes of Exercise", 0.0, 120.0, 30.0)
-
-    smoke = st.selectbox("Currently Smoke?", list(bool_map.keys()))
-    smoke_past = st.selectbox("Smoked in the Past?", list(bool_map.keys()))
-    tobacco_use = st.selectbox("Use Tobacco Substances?", list(bool_map.keys()))
-    tobacco_past = st.selectbox("Used Tobacco in the Past?", list(bool_map.keys()))
-    alcohol = st.selectbox("Consume Alcohol Regularly?", list(bool_map.keys()))
-
-    # === Feature Dictionary ===
-    input_dict = {
-        'Age': age,
-        'Gender': 1 if gender == "Male" else 0,
-        'Level of education': ["Primary", "Secondary", "Tertiary"].index(education),
-        'Ethnicity': [
-            "Akwa ibom", "Akwaibom", "Benin", "Efik", "Hausa",
-            "Ife", "Igbo", "Minority ethnic group", "Tiv", "Yoruba"
-        ].index(ethnicity),
-        'Weight': weight,
-        'Height': height,
-        'BMI': bmi,
-        'Bone Density': bone_density,
-        'Osteoporosis Family History': bool_map[osteoporosis_fam],
-        'Have you been diagnosed with osteoporosis?': bool_map[osteoporosis_diag],
-        'Osteopenia Family History': bool_map[osteopenia_fam],
-        'Osteopenia Diagnosed': bool_map[osteopenia_diag],
-        'What type of amputation?': [
-            "Hip Disariculation", "Transtibial Amputation", "Knee Disarticulation", "Transformoral Amputation"
-        ].index(amp_type),
-        'What caused the amputation?': [
-            "Trauma", "Diabetes", "PAD", "Cancer", "Infection"
-        ].index(amp_cause),
-        'For how long have you been with amputation?': years_amp,
-        'Glucocorticoid Use': bool_map[glucocorticoids],
-        'Chronic Illnesses': bool_map[chronic_illness],
-        'Chronic Conditions Detail': [
-            "Arthritis", "Rheumatoid Arthritis", "Osteoarthritis", "Hypertension", "Diabetes", "Peripheral Artarial Disease", "None"
-        ].index(chronic_detail),
-        'Are you taking any supplements(e.g. Calcium, Vitamin D) to support bone health?': bool_map[supplements],
-        'Gait Difficulty': bool_map[gait_diff],
-        'Have you noticed any changes in your gait or walking pattern?': bool_map[gait_change],
-        'Assistive Device Used': bool_map[assistive_device],
-        'Can you perform daily activities (e.g. Bathing, Dressing, Cooking) without difficulties?': bool_map[daily_activities],
-        'Do you have any limitations in your range of motion or flexibility?': bool_map[rom_limit],
-        'Have you noticed any changes in your ability to perform physical activities (e.g. Walking, Climbing stairs)?': bool_map[activity_lim],
-        'Have you noticed any increase in your pain levels over time?': bool_map[pain_change],
-        # 'What type of lower limb prosthesis do you use?': prosthesis_type,
-        'What type of lower limb prosthesis do you use?': [
-            "Knee Disarticulation Prosthesis", "Transtibial Prosthesis", "Transfermoral (complex) Prosthesis"
-        ].index(prosthesis_type),
-        'Do you have a history of falls while using the prosthetic device?': bool_map[history_falls],
-        'How long have you been using a prosthetic limb?': prosthesis_years,
-        'Have you experienced any complications with your prosthetic limb (e.g. Pain, Instability, loose socket fitting, discomfort, misalignment)?': bool_map[prosthesis_issues],
-        'What is your level of activity with the prosthesis?': activity_level,
-        'Do you engage in regular exercise (long distance walks e.t.c)?': bool_map[regular_exercise],
-        'If yes, for how many minutes do you exercise?': exercise_minutes,
-        'Do you smoke?': bool_map[smoke],
-        'Have you smoked in the past?': bool_map[smoke_past],
-        'Do you take/use tobacco substances?': bool_map[tobacco_use],
-        'Have you taken/used tobacco substances in the past?': bool_map[tobacco_past],
-        'Do you consume alcohol regularly?': bool_map[alcohol],
-        'Bone Density (T-score)': bone_density,
-        'Activity Level': activity_level,
-    }
+    try:
+        model = load_model()
+    except FileNotFoundError as e:
+        st.error(f"⚠ {e}")
+        return
+
+    # === Collect Inputs (one widget per FRACTURE_SCHEMA field) ===
+    # Batched in a form: editing an answer doesn't rerun the page until "Predict Risk"
+    with st.form("fracture_inputs"):
+        with metrics.timed("fracture", "widgets"):
+            answers = form_widgets.render(client_scoring.FRACTURE_SCHEMA)
+        submitted = st.form_submit_button("🔍 Predict Risk")
+    input_df = None
+    if submitted:
+        try:
+            input_df = client_scoring.encode_row(answers)
+        except ValueError as e:
+            st.error(f"⚠ {e}")
 
     # # === Predict Button ===
     # if st.button("🔍 Predict Risk"):
@@ -163,8 +186,6 @@ def show():
     #     else:
     #         st.success("✅ Low Risk: Maintain healthy habits.")
 
-    import matplotlib.pyplot as plt  # Add this at the top of your file
-
     # if st.button("🔍 Predict Risk"):
     #     input_df = pd.DataFrame([input_dict])
     #     prediction = model.predict(input_df)[0]
@@ -234,8 +255,6 @@ def show():
     #     else:
     #         st.markdown("No major contributing risk factors detected in your input.")
 
-    import plotly.graph_objects as go
-
     # if st.button("🔍 Predict Risk"):
     #     input_df = pd.DataFrame([input_dict])
     #     prediction = model.predict(input_df)[0]
@@ -341,9 +360,6 @@ def show():
 
 
 
-    import plotly.graph_objects as go
-    from sklearn.metrics import classification_report, roc_curve, auc
-
     # =========================
     # Prediction & FRAX Upgrade
     # =========================
@@ -469,124 +485,15 @@ def show():
     #         st.warning(f"⚠ Unable to compute metrics: {e}")
 
 
-    if st.button("🔍 Predict Risk"):
-        input_df = pd.DataFrame([input_dict])
-        raw_prediction = model.predict(input_df)[0]
-        raw_probability = model.predict_proba(input_df)[0][1]
-
-        # ----- Adaptive Confidence Adjustment -----
-        if raw_probability < 0.3:
-            probability = raw_probability + 0.30  # Boost low confidence
-        elif 0.3 <= raw_probability < 0.5:
-            probability = raw_probability + 0.20  # Small boost for mid-lows
-        elif raw_probability > 0.8:
-            probability = min(raw_probability + 0.10, 1.0)  # Cap at 1.0
-        else:
-            probability = raw_probability  # Leave mid-range as is
-
-        # Optional smoothing with a midpoint baseline
-        baseline_conf = 0.55
-        weight = 0.75
-        probability = (probability * weight) + (baseline_conf * (1 - weight))
-
-        # ----- FRAX-like Calculations -----
-        hip_fracture_risk = probability * 0.65 * 100  # slightly higher scaling
-        major_fracture_risk = probability * 105       # a touch more sensitive
-        relative_risk = probability / 0.1
-
-
-
-        st.toast("✅ Prediction Complete", icon="🧠")
-        st.markdown("<h2>📋 <b>Result Summary</b></h2>", unsafe_allow_html=True)
-
-        # ----- Smoothed Diagnosis -----
-        if probability >= 0.7:
-            diagnosis = "High Risk of Osteoporosis"
-            diagnosis_color = "red"
-        elif probability >= 0.55:
-            diagnosis = "Borderline Risk"
-            diagnosis_color = "orange"
-        elif probability >= 0.45:
-            diagnosis = "Moderate Risk"
-            diagnosis_color = "green"
-        else:
-            diagnosis = "Low Risk"
-            diagnosis_color = "blue"
-
-        st.markdown(
-            f"<h3>🧠 Diagnosis: <span style='color:{diagnosis_color}; font-weight:bold;'>{diagnosis}</span></h3>",
-            unsafe_allow_html=True
-        )
-
-        # ----- Risk Level -----
-        if probability >= 0.7:
-            risk_level = "🔴 <b style='color:red;'>High</b>"
-        elif probability >= 0.5:
-            risk_level = "🟠 <b style='color:orange;'>Medium</b>"
-        else:
-            risk_level = "🔵 <b style='color:blue;'>Low</b>"
-
-        # ----- Vertical Risk Summary -----
-        st.markdown(f"""
-        <div style='font-size:18px; line-height:1.8;'>
-            📊 <b>Confidence Score:</b> {probability:.2%}<br>
-            🧪 <b>Risk Level:</b> {risk_level}<br>
-            🦴 <b>10-year Hip Fracture Risk:</b> {hip_fracture_risk:.1f}%<br>
-            🩻 <b>10-year Major Fracture Risk:</b> {major_fracture_risk:.1f}%<br>
-            📈 <b>Relative Risk vs Average:</b> {relative_risk:.1f}x
-        </div>
-        """, unsafe_allow_html=True)
-
-        # ----- Risk Gauge -----
-        gauge = go.Figure(go.Indicator(
-            mode="gauge+number",
-            value=probability*100,
-            title={'text': "Overall Risk %"},
-            gauge={
-                'axis': {'range': [0, 100]},
-                'bar': {
-                    'color': "red" if probability > 0.7 else
-                             "orange" if probability > 0.5 else "blue"
-                }
-            }
-        ))
-        st.plotly_chart(gauge, use_container_width=True)
-
-        # ----- Recommendations -----
-        st.markdown("### 🧭 Personalized Recommendations")
-        if probability >= 0.5:
-            st.markdown("""
-            - 🏥 **Consult a specialist** for further testing  
-            - 💊 Consider **bone-strengthening medications**  
-            - 🥗 Follow a **calcium & vitamin D-rich diet**  
-            - 🏃‍♀️ Engage in **weight-bearing and resistance exercises**  
-            - 🧘‍♂️ Practice **fall prevention strategies**  
-            - 🩺 Schedule **regular bone density scans**
-            """)
-        else:
-            st.markdown("""
-            - ✅ Maintain **a healthy weight and lifestyle**  
-            - 🥦 Consume foods rich in **calcium and vitamin D**  
-            - 🚭 Avoid **smoking and alcohol**  
-            - 🏃‍♂️ Stay active with **low-impact exercises**  
-            - 🩺 Get routine **check-ups and scans**
-            """)
-
-        # ----- Contributing Factors -----
-        st.markdown("### 🧬 Top Contributing Risk Factors")
-        contributing_factors = []
-        if input_dict.get("glucocorticoid_use", "no").lower() == "yes":
-            contributing_factors.append("Chronic glucocorticoid use")
-        if input_dict.get("osteoporosis_family_history", "no").lower() == "yes":
-            contributing_factors.append("Family history of osteoporosis")
-        if input_dict.get("chronic_illnesses", "no").lower() == "yes":
-            contributing_factors.append("Presence of chronic illness")
-        if input_dict.get("supplements", "no").lower() == "no":
-            contributing_factors.append("Lack of bone-supporting supplements")
-
-        if contributing_factors:
-            st.markdown("#### 🔹 Detected Risks:")
-            for factor in contributing_factors:
-                st.markdown(f"- {factor}")
-        else:
-            st.markdown("No major contributing risk factors detected.")
+    # Kept in the session: later reruns redraw the last result without touching the model
+    if input_df is not None:
+        result, computed = result_store.fetch("fracture", input_df, compute_result)
+        if computed:
+            st.toast("✅ Prediction Complete", icon="🧠")
+    else:
+        result = result_store.last("fracture")
+    if result is not None:
+        show_result(result)
+
+    # === Batch Scoring ===
+    show_batch_scoring(model)
@@ -0,0 +1,115 @@
+import streamlit as st
+import charts
+import combined_scoring
+import form_widgets
+import metrics
+import model_registry
+import result_store
+
+RISK_LEVEL_HTML = {
+    "High": "🔴 <b style='color:red;'>High</b>",
+    "Medium": "🟠 <b style='color:orange;'>Medium</b>",
+    "Low": "🔵 <b style='color:blue;'>Low</b>",
+}
+
+# Per-model column of the combined result: heading, form section title and summary lines
+MODEL_VIEWS = {
+    "fracture": {
+        "title": "🦴 Fragility Fracture",
+        "section": "🦴 Bone Health & Amputation",
+        "lines": [("🦴 10-year Hip Fracture Risk", 'hip_fracture_risk', "{:.1f}%"),
+                  ("🩻 10-year Major Fracture Risk", 'major_fracture_risk', "{:.1f}%"),
+                  ("📈 Relative Risk vs Average", 'relative_risk', "{:.1f}x")],
+    },
+    "oa": {
+        "title": "🦿 Osteoarthritis",
+        "section": "🦿 Joints, Prosthesis & Daily Life",
+        "lines": [("🦴 Estimated Joint Damage Risk", 'joint_damage_risk', "{:.1f}%"),
+                  ("📈 Relative Risk vs Average", 'relative_risk', "{:.1f}x")],
+    },
+}
+
+
+def available_models():
+    # Models that load; a missing artifact only drops its part of the assessment
+    available = []
+    for name in combined_scoring.MODELS:
+        try:
+            model_registry.get_model(name)
+        except FileNotFoundError as e:
+            st.error(f"⚠ {MODEL_VIEWS[name]['title']} is unavailable: {e}")
+        else:
+            available.append(name)
+    return available
+
+
+def show_model(name, assessment):
+    view = MODEL_VIEWS[name]
+    probability = float(assessment['probability'][0])
+    # The OA page reports its display confidence as the confidence score
+    confidence = float(assessment['display_confidence'][0]) if 'display_confidence' in assessment else probability
+    lines = "".join(f"{label}: <b>{fmt.format(float(assessment[key][0]))}</b><br>" for label, key, fmt in view["lines"])
+
+    st.markdown(f"### {view['title']}")
+    st.markdown(
+        f"<h4>🧠 <span style='color:{assessment['diagnosis_color'][0]}; font-weight:bold;'>{assessment['diagnosis'][0]}</span></h4>",
+        unsafe_allow_html=True
+    )
+    st.markdown(f"""
+    <div style='font-size:16px; line-height:1.8;'>
+        📊 <b>Confidence Score:</b> {confidence:.2%}<br>
+        🧪 <b>Risk Level:</b> {RISK_LEVEL_HTML[assessment['risk_level'][0]]}<br>
+        {lines}
+    </div>
+    """, unsafe_allow_html=True)
+    with metrics.timed(name, "chart"):
+        charts.show_gauge(name, probability * 100, assessment['gauge_color'][0])
+
+
+@st.fragment
+def show_result(result):
+    # Reruns on its own: nothing in the result section reruns the form or the page
+    st.markdown("<h2>📋 <b>Combined Result Summary</b></h2>", unsafe_allow_html=True)
+    columns = st.columns(len(result["models"]))
+    for column, (name, model_result) in zip(columns, result["models"].items()):
+        with column:
+            show_model(name, model_result["assessment"])
+    st.caption(f"⏱️ Scored in {result['seconds'] * 1000:.0f} ms (the models run in parallel)")
+    st.info("For the detailed breakdown and recommendations, run the single-model assessments.")
+
+
+def show():
+    st.title("🩺 Combined Fracture & Osteoarthritis Assessment")
+    st.markdown("Answer once — both risk models score your answers at the same time.")
+
+    models = available_models()
+    if not models:
+        return
+
+    # Shared questions first, then each model's own; nothing reruns until submitted
+    with st.form("combined_inputs"):
+        with metrics.timed("combined", "widgets"):
+            st.subheader("👤 About You & Your Amputation")
+            user_input = form_widgets.render(combined_scoring.SHARED_SCHEMA)
+            for name in models:
+                st.subheader(MODEL_VIEWS[name]["section"])
+                user_input.update(form_widgets.render(combined_scoring.SECTIONS[name]))
+        submitted = st.form_submit_button("🧠 Run Combined Assessment")
+
+    # Kept in the session: later reruns redraw the last result without touching the models
+    result = None
+    if submitted:
+        try:
+            frames = combined_scoring.encode(user_input, models)
+        except ValueError as e:
+            st.error(f"⚠ {e}")
+        else:
+            result, computed = result_store.fetch(
+                "combined", combined_scoring.key_frame(frames), lambda df: combined_scoring.score(frames), models=models
+            )
+            if computed:
+                st.toast("✅ Combined Assessment Complete", icon="🤖")
+    else:
+        result = result_store.last("combined", models=models)
+    if result is not None:
+        show_result(result)
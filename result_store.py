@@ -0,0 +1,44 @@
+import streamlit as st
+
+import model_registry
+import prediction_cache
+
+# === Per-session result persistence ===
+# The last assessment per model (probability, bands, figures, explanations), kept in
+# st.session_state under a hash of the encoded inputs and the model version it was
+# computed with. Any later rerun — another widget, a fragment, coming back to the page —
+# redraws it from the session; only a new submission (or a replaced model) recomputes.
+
+
+def _slot(name):
+    return f"result_{name}"
+
+
+def _versions(name, models):
+    # A combined result (several models under one name) is stale when any of them is replaced
+    if models is None:
+        return model_registry.loaded_version(name)
+    return tuple(model_registry.loaded_version(model) for model in models)
+
+
+def input_key(name, input_df, models=None):
+    return _versions(name, models), prediction_cache.feature_key(input_df.to_numpy())
+
+
+def fetch(name, input_df, compute, models=None):
+    """(result for these inputs, True if it was computed now); compute(input_df) runs once per distinct submission."""
+    key = input_key(name, input_df, models)
+    saved = st.session_state.get(_slot(name))
+    if saved is not None and saved["key"] == key:
+        return saved["result"], False
+    result = compute(input_df)
+    st.session_state[_slot(name)] = {"key": key, "result": result}
+    return result, True
+
+
+def last(name, models=None):
+    # The session's latest result, unless the model was replaced since
+    saved = st.session_state.get(_slot(name))
+    if saved is None or saved["key"][0] != _versions(name, models):
+        return None
+    return saved["result"]
@@ -0,0 +1,77 @@
+import os
+
+import numpy as np
+
+import metrics
+
+# === Shared scoring API ===
+# One predict_proba pass per request or batch: the class label is the class-1
+# probability compared against a per-model decision threshold, and the adjusted
+# confidence is derived from the same probabilities — no separate model.predict.
+#
+# Thresholds can be overridden with SCORING_THRESHOLDS="oa=0.45,fracture=0.5".
+
+DEFAULT_THRESHOLD = 0.5  # same decision as model.predict() for a binary classifier
+
+THRESHOLDS = {
+    "fracture": DEFAULT_THRESHOLD,
+    "oa": DEFAULT_THRESHOLD,
+    "osteo": DEFAULT_THRESHOLD,
+}
+
+
+def _parse_thresholds(spec):
+    thresholds = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, value = item.partition("=")
+        thresholds[name.strip()] = float(value)
+    return thresholds
+
+
+THRESHOLDS.update(_parse_thresholds(os.environ.get("SCORING_THRESHOLDS", "")))
+
+
+def threshold(name):
+    return THRESHOLDS.get(name, DEFAULT_THRESHOLD)
+
+
+def set_threshold(name, value):
+    if not 0.0 <= value <= 1.0:
+        raise ValueError(f"Threshold for '{name}' must be between 0 and 1, got {value}")
+    THRESHOLDS[name] = value
+
+
+def predict(model, X, threshold=DEFAULT_THRESHOLD):
+    """Class-1 probability and thresholded label from a single predict_proba call."""
+    if len(X) == 0:  # every row of the chunk was quarantined
+        return np.empty(0), np.asarray(model.classes_)[:0]
+    probability = model.predict_proba(X)[:, 1]
+    # Strictly above, so the default matches predict()'s argmax (ties go to class 0)
+    label = np.asarray(model.classes_)[(probability > threshold).astype(int)]
+    return probability, label
+
+
+def _adjuster(name):
+    # Imported lazily: the per-model modules use predict()/threshold() from here
+    if name == "fracture":
+        import client_scoring
+        return client_scoring.adjust_confidence
+    if name == "oa":
+        import partner_scoring
+        return partner_scoring.adjust_confidence
+    return None
+
+
+def score(name, X, model=None):
+    """Probability, label and adjusted confidence for each row of an encoded frame."""
+    if model is None:
+        import prediction_cache
+        model = prediction_cache.get_cached_model(name)
+    with metrics.timed(name, "model"):
+        probability, label = predict(model, X, threshold(name))
+    adjust = _adjuster(name)
+    return {
+        "probability": probability,
+        "label": label,
+        "confidence": adjust(probability) if adjust is not None else probability,
+    }
@@ -0,0 +1,279 @@
+import argparse
+import csv
+import json
+import os
+import shutil
+import time
+
+import pandas as pd
+
+import batch_client
+import client_scoring
+import feature_schema
+import model_registry
+import parallel_scoring
+import partner_scoring
+
+# === Streaming, resumable scoring pipeline (pyarrow) ===
+# For registry exports larger than RAM. Every stage is a generator over fixed-size
+# chunks, so memory stays flat whatever the file size:
+#
+#   read (pyarrow CSV/Parquet reader, re-sliced to CHUNKSIZE rows)
+#     -> validate / encode / score / adjust (score_valid; in-process or a worker pool)
+#     -> write one Parquet part per chunk (+ quarantined rows) -> record progress
+#
+# Parts and progress.json live in <output>.parts/ until the last chunk is done; then
+# the parts are streamed into the final CSV/Parquet file and the directory is removed.
+# A crashed run restarts from the first chunk without a part: same input, chunk size
+# and model, or it refuses to mix results (use --restart).
+#
+#   python scoring_pipeline.py fracture export.csv scores.parquet
+#   python scoring_pipeline.py oa export.parquet scores.csv --workers 8
+
+DEFAULT_CHUNKSIZE = 50_000
+CSV_BLOCK_BYTES = 1 << 20  # larger blocks read ahead further and grow the Arrow pool
+PROGRESS = "progress.json"
+
+SCHEMAS = {
+    "fracture": client_scoring.FRACTURE_SCHEMA,
+    "oa": partner_scoring.PARTNER_SCHEMA,
+}
+
+
+# --- read ---
+def _csv_batches(path):
+    import pyarrow as pa
+    import pyarrow.csv as pv
+
+    # Everything as text: a stray "abc" in a numeric column is quarantined by validation
+    # instead of failing pyarrow's type inference halfway through the file
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        columns = next(csv.reader(f))
+    reader = pv.open_csv(
+        path,
+        read_options=pv.ReadOptions(block_size=CSV_BLOCK_BYTES),
+        convert_options=pv.ConvertOptions(
+            column_types={column: pa.string() for column in columns},
+            null_values=batch_client.NA_VALUES, strings_can_be_null=True,
+        ),
+    )
+    yield from reader
+
+
+def _parquet_batches(path, skip_rows):
+    import pyarrow.parquet as pq
+
+    parquet = pq.ParquetFile(path)
+    # Whole row groups before the resume point are never decoded
+    first, skipped = 0, 0
+    while first < parquet.num_row_groups and skipped + parquet.metadata.row_group(first).num_rows <= skip_rows:
+        skipped += parquet.metadata.row_group(first).num_rows
+        first += 1
+    return parquet.iter_batches(row_groups=range(first, parquet.num_row_groups)), skipped
+
+
+def read_tables(path, chunksize, skip_rows=0):
+    """pyarrow Tables of exactly `chunksize` rows (the last may be shorter), after `skip_rows`."""
+    import pyarrow as pa
+
+    if batch_client.file_format(path) == "csv":
+        batches, skipped = _csv_batches(path), 0
+    else:
+        batches, skipped = _parquet_batches(path, skip_rows)
+    to_skip = skip_rows - skipped
+    buffered, rows = [], 0
+    for batch in batches:
+        if to_skip:
+            drop = min(to_skip, batch.num_rows)
+            batch, to_skip = batch.slice(drop), to_skip - drop
+        buffered.append(batch)
+        rows += batch.num_rows
+        while rows >= chunksize:
+            table = pa.Table.from_batches(buffered)
+            yield table.slice(0, chunksize)
+            rest = table.slice(chunksize)
+            buffered, rows = rest.to_batches(), rest.num_rows
+    if rows:
+        yield pa.Table.from_batches(buffered)
+
+
+# --- score ---
+def _typed(scored, schema):
+    # Numeric answers read as text come back as numbers, with one dtype across all parts
+    for field in feature_schema.inputs(schema):
+        if field["type"] in ("number", "integer") and field["name"] in scored.columns:
+            values = pd.to_numeric(scored[field["name"]])
+            scored[field["name"]] = values.astype("int64" if field["type"] == "integer" else "float64")
+    return scored
+
+
+def score_tables(name, source, tables, workers=1, start=0, strict=False):
+    """(scored rows, quarantined rows or None) per input chunk, in order."""
+    chunks = (table.to_pandas() for table in tables)
+    quarantine = None if strict else []
+    if workers > 1:
+        scored_chunks = parallel_scoring.score_parallel(name, source, chunks, workers, quarantine=quarantine,
+                                                        start=start)
+    else:
+        score = parallel_scoring.SCORERS[name](model_registry.ModelRegistry({name: source}).get(name))
+        scored_chunks = (
+            batch_client.merge_results(chunk, *score(chunk), quarantine)
+            for chunk in batch_client.number_rows(chunks, start)
+        )
+    for scored in scored_chunks:
+        # merge_results adds at most one quarantine frame per chunk, just before yielding it
+        rejected = quarantine.pop() if quarantine else None
+        yield _typed(scored, SCHEMAS[name]), rejected
+
+
+# --- write ---
+def _write_json(path, data):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+
+def _write_part(parts_dir, index, scored, rejected):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    path = os.path.join(parts_dir, f"part-{index:06d}.parquet")
+    pq.write_table(pa.Table.from_pandas(scored, preserve_index=False), f"{path}.tmp")
+    os.replace(f"{path}.tmp", path)
+    if rejected is not None:
+        path = os.path.join(parts_dir, f"quarantine-{index:06d}.csv")
+        rejected.to_csv(f"{path}.tmp", index=False)
+        os.replace(f"{path}.tmp", path)
+
+
+def _assemble(parts_dir, chunks, dest):
+    # Stream the parts into the final file one at a time
+    import pyarrow as pa
+    import pyarrow.csv as pv
+    import pyarrow.parquet as pq
+
+    parts = [os.path.join(parts_dir, f"part-{index:06d}.parquet") for index in range(chunks)]
+    # One schema for every part: a column that is all-null in one chunk, or whole numbers
+    # in one and decimals in another, still lines up
+    schema = pa.unify_schemas([pq.read_schema(path) for path in parts], promote_options="permissive") \
+        if parts else None
+    writer = None
+    rows = 0
+    try:
+        for path in parts:
+            table = pq.read_table(path)
+            if not table.num_rows:
+                continue
+            if writer is None:
+                if batch_client.file_format(dest) == "csv":
+                    writer = pv.CSVWriter(f"{dest}.tmp", schema)
+                else:
+                    writer = pq.ParquetWriter(f"{dest}.tmp", schema)
+            writer.write_table(table.cast(schema))
+            rows += table.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is None:
+        # Every row quarantined (or an empty roster): still leave a file with the result columns
+        empty = (schema or pa.schema([])).empty_table()
+        if batch_client.file_format(dest) == "csv":
+            pv.write_csv(empty, f"{dest}.tmp")
+        else:
+            pq.write_table(empty, f"{dest}.tmp")
+    os.replace(f"{dest}.tmp", dest)
+
+    quarantined = [
+        os.path.join(parts_dir, f"quarantine-{index:06d}.csv") for index in range(chunks)
+        if os.path.exists(os.path.join(parts_dir, f"quarantine-{index:06d}.csv"))
+    ]
+    if quarantined:
+        with open(batch_client.quarantine_path(dest), "w", newline="") as out:
+            for i, path in enumerate(quarantined):
+                with open(path, newline="") as f:
+                    if i:
+                        f.readline()  # header
+                    shutil.copyfileobj(f, out)
+    return rows
+
+
+# --- resume ---
+def parts_dir(dest):
+    return f"{dest}.parts"
+
+
+def _job(name, source, input_path, chunksize):
+    st = os.stat(input_path)
+    return {
+        "model": name,
+        "model_source": source,
+        "model_version": model_registry.ModelRegistry({name: source}).version(name),
+        "input": os.path.abspath(input_path),
+        "input_version": f"{st.st_mtime_ns:x}-{st.st_size:x}",
+        "chunksize": chunksize,
+    }
+
+
+def _load_progress(directory, job, restart):
+    path = os.path.join(directory, PROGRESS)
+    if restart:
+        shutil.rmtree(directory, ignore_errors=True)
+    elif os.path.exists(path):
+        with open(path) as f:
+            progress = json.load(f)
+        if progress["job"] != job:
+            raise ValueError(f"{directory} holds a run with a different input, model or chunk size; "
+                             "rerun with --restart to discard it")
+        return progress
+    os.makedirs(directory, exist_ok=True)
+    return {"job": job, "chunks": 0, "rows": 0, "scored": 0, "quarantined": 0, "complete": False}
+
+
+def run(name, source, input_path, dest, chunksize=DEFAULT_CHUNKSIZE, workers=1, strict=False, restart=False):
+    """Score `input_path` into `dest`, resuming an interrupted run; returns the progress record."""
+    directory = parts_dir(dest)
+    progress = _load_progress(directory, _job(name, source, input_path, chunksize), restart)
+    if not progress["complete"]:
+        tables = read_tables(input_path, chunksize, skip_rows=progress["rows"])
+        for scored, rejected in score_tables(name, source, tables, workers, progress["rows"], strict):
+            _write_part(directory, progress["chunks"], scored, rejected)
+            # Progress is written after the part, so a crash in between just redoes that chunk
+            progress["chunks"] += 1
+            progress["rows"] += len(scored) + (0 if rejected is None else len(rejected))
+            progress["scored"] += len(scored)
+            progress["quarantined"] += 0 if rejected is None else len(rejected)
+            _write_json(os.path.join(directory, PROGRESS), progress)
+        progress["complete"] = True
+        _write_json(os.path.join(directory, PROGRESS), progress)
+    _assemble(directory, progress["chunks"], dest)
+    shutil.rmtree(directory)
+    return progress
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream a large roster through scoring, resumably.")
+    parser.add_argument("name", choices=list(SCHEMAS), help="registry model to score with")
+    parser.add_argument("input", help="CSV or Parquet roster (one patient per row)")
+    parser.add_argument("output", help="CSV or Parquet file to write the scores to")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="rows per chunk")
+    parser.add_argument("--workers", type=int, default=1, help="score chunks on this many worker processes")
+    parser.add_argument("--model", help="model pickle or .artifact directory (default: the registry's, "
+                                        "preferring its .artifact)")
+    parser.add_argument("--strict", action="store_true",
+                        help="fail on the first invalid row instead of quarantining it")
+    parser.add_argument("--restart", action="store_true", help="discard a previous run's parts and start over")
+    args = parser.parse_args(argv)
+
+    source = parallel_scoring.model_source(args.name, args.model)
+    start = time.perf_counter()
+    progress = run(args.name, source, args.input, args.output, args.chunksize, args.workers, args.strict,
+                   args.restart)
+    elapsed = time.perf_counter() - start
+    print(f"✅ Scored {progress['scored']} rows -> {args.output} in {elapsed:.1f}s ({progress['chunks']} chunks)")
+    if progress["quarantined"]:
+        print(f"⚠ Quarantined {progress['quarantined']} invalid rows -> {batch_client.quarantine_path(args.output)}")
+
+
+if __name__ == "__main__":
+    main()
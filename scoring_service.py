@@ -0,0 +1,189 @@
+import argparse
+import json
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+import client_scoring
+import feature_schema
+import metrics
+import micro_batcher
+import model_registry
+import partner_scoring
+import prediction_cache
+
+# === Headless JSON-over-HTTP scoring service ===
+# Same preprocessing and confidence adjustment as the Streamlit pages, without a
+# browser session or script rerun per call.
+#
+#   python scoring_service.py --port 8600
+#
+#   GET  /health                     -> registry status
+#   GET  /metrics                    -> per-stage latency histograms (Prometheus text format)
+#   POST /v1/fracture/predict        {answers}                 -> {"result": {...}}
+#   POST /v1/fracture/predict/batch  {"records": [{answers}]}  -> {"results": [...]}
+#   POST /v1/oa/predict              (same shapes, partner questionnaire answers)
+#   POST /v1/oa/predict/batch
+#
+# Invalid answers: a single prediction is rejected with 400 and the failed checks; in a
+# batch, only the bad records are quarantined (null result + entries in "errors").
+
+MODELS = ("fracture", "oa")
+MAX_BODY_BYTES = 32 * 1024 * 1024
+
+def score_records(name, records):
+    """(results indexed by record position, error report for the records that failed validation)."""
+    answers = pd.DataFrame.from_records(records)
+    # Single records go through the shared cache, whose misses are micro-batched so
+    # concurrent requests share one predict_proba call; batch requests are already vectorized
+    if len(records) == 1:
+        model = prediction_cache.get_cached_model(name)
+    else:
+        model = model_registry.get_model(name)
+    if name == "fracture":
+        return client_scoring.score_valid(model, answers)
+    if name == "oa":
+        return partner_scoring.score_valid(model, partner_scoring.encoder_for(model_registry.get_model("oa")), answers)
+    raise KeyError(name)
+
+
+def health():
+    return {
+        "status": "ok",
+        "models": model_registry.stats(),
+        "prediction_cache": prediction_cache.stats(),
+    }
+
+
+def parse_path(path):
+    """(model name, batch?) for a /v1/<model>/predict[/batch] path, else None."""
+    parts = path.strip("/").split("/")
+    if len(parts) not in (3, 4) or parts[0] != "v1" or parts[1] not in MODELS or parts[2] != "predict" \
+            or (len(parts) == 4 and parts[3] != "batch"):
+        return None
+    return parts[1], len(parts) == 4
+
+
+def _error(status, message):
+    return status, json.dumps({"error": message})
+
+
+def predict(name, batch, payload):
+    """(HTTP status, JSON body) for one predict request body; shared by both front ends."""
+    try:
+        body = json.loads(payload or b"null")
+    except json.JSONDecodeError as e:
+        return _error(400, f"Invalid JSON: {e}")
+
+    records = body.get("records") if batch and isinstance(body, dict) else [body]
+    if not isinstance(records, list) or not records or not all(isinstance(r, dict) for r in records):
+        return _error(400, "Expected a JSON object" + (" with a non-empty 'records' list" if batch else ""))
+
+    try:
+        results, errors = score_records(name, records)
+    except FileNotFoundError as e:
+        return _error(503, str(e))
+    except micro_batcher.BatcherClosed:
+        return _error(503, f"The '{name}' model is being reloaded, retry shortly")
+    except TimeoutError:
+        return _error(504, f"'{name}' scoring took longer than {micro_batcher.RESULT_TIMEOUT_SECONDS:g}s")
+    except KeyError as e:
+        return _error(400, f"Missing answer: {e}")
+    except ValueError as e:
+        return _error(400, str(e))
+
+    if not batch and len(errors):
+        return 400, json.dumps({
+            "error": feature_schema.describe(errors), "errors": json.loads(errors.to_json(orient="records")),
+        })
+
+    # DataFrame.to_json handles the NumPy scalar types json.dumps rejects
+    if not len(errors):
+        rows = results.to_json(orient="records")
+        return 200, f'{{"results": {rows}}}' if batch else f'{{"result": {rows[1:-1]}}}'
+    # Quarantined records come back as null results, with every failed check listed in "errors"
+    scored = json.loads(results.to_json(orient="index"))
+    return 200, json.dumps({
+        "results": [scored.get(str(i)) for i in range(len(records))],
+        "errors": json.loads(errors.to_json(orient="records")),
+    })
+
+
+class ScoringHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so clients can reuse connections
+    verbose = False
+
+    def log_message(self, format, *args):
+        if self.verbose:
+            super().log_message(format, *args)
+
+    def _send(self, status, body, content_type="application/json"):
+        payload = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _error(self, status, message):
+        self._send(*_error(status, message))
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send(200, json.dumps(health()))
+        elif self.path == "/metrics":
+            self._send(200, metrics.exposition(), metrics.CONTENT_TYPE)
+        else:
+            self._error(404, f"Unknown path {self.path}")
+
+    def do_POST(self):
+        route = parse_path(self.path)
+        if route is None:
+            self._error(404, f"Unknown path {self.path}")
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            self._error(413, "Request body too large")
+            return
+        try:
+            self._send(*predict(*route, self.rfile.read(length)))
+        except Exception as e:
+            # Still a JSON answer (like the tornado front end's write_error), not a dropped connection
+            traceback.print_exc()
+            self._error(500, f"Internal error: {type(e).__name__}")
+
+
+def make_server(host="127.0.0.1", port=8600):
+    return ThreadingHTTPServer((host, port), ScoringHandler)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the fracture and OA models over JSON/HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--no-warm", action="store_true", help="load models on first request instead of at startup")
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    parser.add_argument("--batch-rows", type=int, default=micro_batcher.MAX_BATCH_ROWS,
+                        help="max rows per micro-batch")
+    parser.add_argument("--batch-wait-ms", type=float, default=micro_batcher.MAX_WAIT_MS,
+                        help="max time to wait for a micro-batch to fill")
+    args = parser.parse_args(argv)
+
+    ScoringHandler.verbose = args.verbose
+    micro_batcher.MAX_BATCH_ROWS = args.batch_rows
+    micro_batcher.MAX_WAIT_MS = args.batch_wait_ms
+    if not args.no_warm:
+        model_registry.warm()
+    server = make_server(args.host, args.port)
+    print(f"🩺 Scoring service listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+import argparse
+import builtins
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import model_registry
+from model_registry import _rss_bytes
+
+# === Cold-start profiler ===
+# Times every first-time import (wall time and RSS growth, nested imports included
+# in their parent's numbers) plus named phases such as model loads.
+#
+#   python startup_profile.py --pages --models --json startup.json
+#   STARTUP_PROFILE=1 streamlit run app.py      # new imports printed after each run
+
+
+def _mb(delta):
+    return round(delta / 1e6, 1) if delta is not None else None
+
+
+class StartupProfiler:
+    def __init__(self):
+        self.imports = []
+        self.phases = []
+        self._original_import = None
+        self._depth = threading.local()
+        self._flushed = 0
+        self._start = time.perf_counter()
+        self._start_rss = _rss_bytes()
+
+    def install(self):
+        if self._original_import is None:
+            self._original_import = builtins.__import__
+            builtins.__import__ = self._import
+        return self
+
+    def uninstall(self):
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules:
+            return self._original_import(name, globals, locals, fromlist, level)
+        depth = getattr(self._depth, "value", 0)
+        self._depth.value = depth + 1
+        rss = _rss_bytes()
+        start = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            seconds = time.perf_counter() - start
+            after = _rss_bytes()
+            self._depth.value = depth
+            self.imports.append({
+                "module": name,
+                "depth": depth,
+                "thread": threading.current_thread().name,
+                "seconds": round(seconds, 4),
+                "memory_mb": _mb(after - rss) if rss is not None and after is not None else None,
+            })
+
+    @contextmanager
+    def phase(self, label):
+        rss = _rss_bytes()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            after = _rss_bytes()
+            self.phases.append({
+                "phase": label,
+                "seconds": round(time.perf_counter() - start, 4),
+                "memory_mb": _mb(after - rss) if rss is not None and after is not None else None,
+            })
+
+    def report(self, max_depth=1):
+        rss = _rss_bytes()
+        return {
+            "total_seconds": round(time.perf_counter() - self._start, 4),
+            "rss_mb": _mb(rss),
+            "rss_growth_mb": _mb(rss - self._start_rss) if rss is not None and self._start_rss is not None else None,
+            "phases": self.phases,
+            "models": model_registry.stats(),
+            "imports": [r for r in self.imports if r["depth"] <= max_depth],
+        }
+
+    def format(self, max_depth=1, top=25, report=None):
+        report = report or self.report(max_depth)
+        lines = [f"startup: {report['total_seconds']:.3f}s, RSS {report['rss_mb']} MB "
+                 f"(+{report['rss_growth_mb']} MB)"]
+        if report["phases"]:
+            lines.append("phases:")
+            for p in report["phases"]:
+                lines.append(f"  {p['seconds']:8.3f}s {str(p['memory_mb']):>8} MB  {p['phase']}")
+        loaded = {name: s for name, s in report["models"].items() if s.get("loaded")}
+        if loaded:
+            lines.append("models:")
+            for name, s in loaded.items():
+                memory_mb = round(s['memory_mb'], 1) if s['memory_mb'] is not None else None
+                lines.append(f"  {s['load_seconds']:8.3f}s {str(memory_mb):>8} MB  {name}")
+        lines.append(f"slowest imports (depth <= {max_depth}):")
+        for r in sorted(report["imports"], key=lambda r: r["seconds"], reverse=True)[:top]:
+            lines.append(f"  {r['seconds']:8.3f}s {str(r['memory_mb']):>8} MB  {'  ' * r['depth']}{r['module']}")
+        return "\n".join(lines)
+
+    def flush(self, stream=sys.stderr, max_depth=1, top=25):
+        # Print what was imported since the last flush (e.g. a page opened for the
+        # first time); nothing when a rerun imported nothing new
+        new = self.imports[self._flushed:]
+        self._flushed = len(self.imports)
+        if new:
+            report = self.report(max_depth)
+            report["imports"] = [r for r in new if r["depth"] <= max_depth]
+            print(self.format(max_depth, top, report), file=stream)
+
+
+profiler = StartupProfiler()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile the app's cold start: imports, pages and model loads.")
+    parser.add_argument("--pages", action="store_true", help="also import the prediction pages")
+    parser.add_argument("--models", action="store_true", help="also load every shipped model")
+    parser.add_argument("--depth", type=int, default=1, help="nesting depth of imports to report")
+    parser.add_argument("--top", type=int, default=25, help="number of imports to list")
+    parser.add_argument("--json", help="write the full report to this file")
+    args = parser.parse_args()
+
+    profiler.install()
+    # What `streamlit run app.py` imports before the first render
+    with profiler.phase("import streamlit"):
+        import streamlit  # noqa: F401
+    with profiler.phase("import home, prediction"):
+        import home  # noqa: F401
+        import prediction  # noqa: F401
+    if args.pages:
+        with profiler.phase("import prediction_client"):
+            import prediction_client  # noqa: F401
+        with profiler.phase("import prediction_partner"):
+            import prediction_partner  # noqa: F401
+    if args.models:
+        for name in model_registry.registry.shipped():
+            with profiler.phase(f"load model {name}"):
+                model_registry.get_model(name)
+    profiler.uninstall()
+
+    print(profiler.format(args.depth, args.top))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(profiler.report(args.depth), f, indent=2)
+
+
+if __name__ == "__main__":
+    main()